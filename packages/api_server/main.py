@@ -1,24 +1,38 @@
 # packages/api_server/main.py
 
+import asyncio
+import functools
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
 # We must add the parent 'packages' directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent.resolve()))
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from typing import Any, List, Dict, Optional
 
 # Custom module import
 from parser_engine.hero_data_loader import load_languages
+from parser_engine.usage_index import USAGE_INDEX_FILENAME, load_usage_index
+from parser_engine.query_engine import QuerySyntaxError, build_query_index, compile_query, find_matching_blocks, keyword_query, run_query
+from api_server.metrics import Counter, Gauge, MetricsRegistry, estimate_resident_bytes
+from api_server.sqlite_store import SqliteStore
 
 # --- Application Setup ---
 app = FastAPI(
     title="HeroDB Parser API",
     description="An API to serve and query hero data.",
-    version="1.3.0" # Version bump for auth removal
+    version="1.11.0" # Version bump for the entity usage endpoint
 )
 
 app.add_middleware(
@@ -27,94 +41,607 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
+# --- Metrics ---
+# Exposed in Prometheus text format at /metrics. Routes are labelled by their path
+# template (e.g. '/api/hero/{hero_id}') so the label set stays bounded.
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram("herodb_http_request_duration_seconds", "HTTP request latency by route.", ["route", "method", "status"])
+RESPONSE_BYTES = metrics.counter("herodb_http_response_bytes_total", "Response body bytes sent by route.", ["route", "method"])
+DATA_PATH_LATENCY = metrics.histogram("herodb_data_path_duration_seconds", "Time spent producing a response body, by data path.", ["path"])
+QUERY_INDEX_USAGE = metrics.counter("herodb_query_index_scans_total", "Hero queries by whether the index narrowed the scan.", ["result"])
+HERO_PAYLOAD_LOOKUPS = metrics.counter("herodb_hero_payload_lookups_total", "Hero payload lookups by how they were served.", ["result"])
+DATA_LOAD_SECONDS = metrics.gauge("herodb_data_load_duration_seconds", "Duration of the most recent load of each data source.", ["source"])
+DATA_LOADS = metrics.counter("herodb_data_loads_total", "Number of times each data source was loaded.", ["source"])
+DATASET_BYTES = metrics.gauge("herodb_dataset_resident_bytes", "Approximate resident size of each in-memory dataset.", ["dataset"])
+DATASET_ENTRIES = metrics.gauge("herodb_dataset_entries", "Number of top-level entries in each in-memory dataset.", ["dataset"])
+
+class MetricsMiddleware:
+    """Pure ASGI middleware that records latency and response size per route."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send); return
+        start = time.perf_counter()
+        state = {"status": 500, "bytes": 0}
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start": state["status"] = message["status"]
+            elif message["type"] == "http.response.body": state["bytes"] += len(message.get("body", b""))
+            await send(message)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route=route, method=method, status=state["status"])
+            RESPONSE_BYTES.inc(state["bytes"], route=route, method=method)
+
+app.add_middleware(MetricsMiddleware)
+
+def record_data_load(source: str, seconds: float):
+    DATA_LOAD_SECONDS.set(seconds, source=source)
+    DATA_LOADS.inc(source=source)
+
 # --- Path Setup & Data Loading ---
 PROJECT_ROOT = Path(__file__).parent.parent.parent.resolve()
 DEBUG_JSON_PATH = PROJECT_ROOT / "data" / "output" / "debug_hero_data.json"
+USAGE_INDEX_PATH = DEBUG_JSON_PATH.with_name(USAGE_INDEX_FILENAME)
+# 'memory' (default) loads the JSON and language files into dicts. 'sqlite' serves heroes,
+# queries and language searches from the database written by 'hero_main.py --sqlite'.
+DATA_BACKEND = os.environ.get("HERODB_BACKEND", "memory").lower()
+SQLITE_DB_PATH = Path(os.environ.get("HERODB_SQLITE_PATH", PROJECT_ROOT / "data" / "output" / "hero_data.sqlite"))
 all_hero_data = {}
+hero_payloads = {}
+hero_query_index = None
 language_db = {}
+entity_usage = None # entity_id -> {"kind", "heroes": {hero_id: [paths]}}; None until loaded
+hero_store = None
 
-@app.on_event("startup")
-def load_data():
-    global all_hero_data, language_db
+def read_data_files():
+    global all_hero_data, hero_payloads, hero_query_index, language_db, entity_usage
+    if DATA_BACKEND == "sqlite":
+        open_sqlite_store()
+        return
     print("--- Loading hero data from JSON... ---")
     if DEBUG_JSON_PATH.exists():
+        start = time.perf_counter()
         with open(DEBUG_JSON_PATH, 'r', encoding='utf-8') as f:
-            all_hero_data = json.load(f)
+            new_hero_data = json.load(f)
+        record_data_load("hero_json", time.perf_counter() - start)
+        start = time.perf_counter()
+        hero_payloads = build_hero_payloads(new_hero_data)
+        record_data_load("hero_payloads", time.perf_counter() - start)
+        start = time.perf_counter()
+        hero_query_index = build_query_index(new_hero_data)
+        record_data_load("hero_query_index", time.perf_counter() - start)
+        all_hero_data = new_hero_data
         print(f"✅ Successfully loaded data for {len(all_hero_data)} heroes into memory.")
     else:
         print(f"🚨 WARNING: '{DEBUG_JSON_PATH.name}' not found. API will have partial data.")
+    if USAGE_INDEX_PATH.exists():
+        try:
+            start = time.perf_counter()
+            entity_usage = load_usage_index(USAGE_INDEX_PATH)
+            record_data_load("entity_usage", time.perf_counter() - start)
+            print(f"✅ Loaded usage of {len(entity_usage)} entities.")
+        except Exception as e:
+            print(f"🚨 WARNING: Could not load '{USAGE_INDEX_PATH.name}'. Usage API will not work. Error: {e}")
+    else:
+        print(f"🚨 WARNING: '{USAGE_INDEX_PATH.name}' not found. Usage API will not work.")
     print("--- Loading language data... ---")
     try:
+        start = time.perf_counter()
         language_db = load_languages()
+        record_data_load("language_db", time.perf_counter() - start)
         print(f"✅ Successfully loaded {len(language_db)} language keys.")
     except Exception as e:
         print(f"🚨 WARNING: Could not load language files. Language API will not work. Error: {e}")
+    update_dataset_sizes()
 
-# --- Helper Logic for Querying ---
-def find_nested_properties(data: Any, key_to_find: str, keyword: str, results: List[Dict]):
-    if isinstance(data, dict):
-        if key_to_find in data and isinstance(data[key_to_find], str) and keyword.lower() in data[key_to_find].lower():
-            results.append(data)
-        for value in data.values():
-            find_nested_properties(value, key_to_find, keyword, results)
-    elif isinstance(data, list):
-        for item in data:
-            find_nested_properties(item, key_to_find, keyword, results)
+def open_sqlite_store():
+    global hero_store
+    print(f"--- Opening SQLite database '{SQLITE_DB_PATH.name}'... ---")
+    try:
+        start = time.perf_counter()
+        new_store = SqliteStore(SQLITE_DB_PATH)
+        record_data_load("sqlite_db", time.perf_counter() - start)
+    except Exception as e:
+        print(f"🚨 WARNING: Could not open the SQLite database. Run 'hero_main.py --sqlite' first. Error: {e}")
+        return
+    # Connections of a replaced store are closed once its last in-flight request lets go of it.
+    hero_store = new_store
+    fts_note = "with" if hero_store.has_fts else "without"
+    print(f"✅ Serving {hero_store.hero_count} heroes and {hero_store.lang_key_count} language keys from SQLite ({fts_note} FTS5).")
 
-# --- Public API Endpoints ---
+def update_dataset_sizes():
+    for name, dataset in (("all_hero_data", all_hero_data), ("language_db", language_db), ("hero_payloads", hero_payloads), ("entity_usage", entity_usage or {})):
+        DATASET_BYTES.set(estimate_resident_bytes(dataset), dataset=name)
+        DATASET_ENTRIES.set(len(dataset), dataset=name)
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the HeroDB Parser API!"}
+@app.on_event("startup")
+def load_data():
+    read_data_files()
+    query_cache.invalidate()
 
-@app.get("/api/heroes")
-def get_all_hero_ids():
-    return {"hero_ids": sorted(list(all_hero_data.keys()))}
+@app.on_event("shutdown")
+def shutdown_search_pool():
+    search_pool.shutdown()
+    if hero_store: hero_store.close()
 
-@app.get("/api/hero/{hero_id}")
-def get_hero_data(hero_id: str):
-    hero_data = all_hero_data.get(hero_id)
-    if not hero_data:
+# --- Search Worker Pool ---
+# Heavy scans run on their own bounded executor so they never occupy Starlette's
+# shared threadpool; cheap lookups are async handlers that stay on the event loop.
+SEARCH_MAX_WORKERS = int(os.environ.get("HERODB_SEARCH_WORKERS", "2"))
+SEARCH_MAX_QUEUE = int(os.environ.get("HERODB_SEARCH_QUEUE", "8"))
+SEARCH_TIMEOUT_SEC = float(os.environ.get("HERODB_SEARCH_TIMEOUT", "10"))
+
+class SearchCancelled(Exception):
+    """Raised inside a worker when its request timed out or the client went away."""
+
+class SearchPool:
+    def __init__(self, max_workers: int, max_queue: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="herodb-search")
+        self._semaphore = None
+        self.stats = {"queued": 0, "in_flight": 0, "completed": 0, "rejected": 0, "timed_out": 0, "cancelled": 0, "failed": 0}
+
+    async def run(self, func, *args):
+        """Runs func(*args, cancel_event) on the pool, enforcing the queue limit and timeout."""
+        if self._semaphore is None: self._semaphore = asyncio.Semaphore(self.max_workers)
+        if self.stats["queued"] >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Search queue is full. Please retry shortly.")
+        cancel_event = threading.Event()
+        self.stats["queued"] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["in_flight"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            worker_future = self.executor.submit(func, *args, cancel_event)
+        except BaseException:
+            self._release(); raise
+        # The slot is held until the worker thread actually finishes: a timed-out or cancelled
+        # request only stops its scan cooperatively, and it keeps using a worker until then.
+        def on_worker_done(_):
+            try: loop.call_soon_threadsafe(self._release)
+            except RuntimeError: pass # the event loop has already shut down
+        worker_future.add_done_callback(on_worker_done)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(worker_future), timeout=self.timeout)
+            self.stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            cancel_event.set(); self.stats["timed_out"] += 1
+            raise HTTPException(status_code=504, detail=f"Search exceeded the {self.timeout:g}s time limit.")
+        except asyncio.CancelledError:
+            cancel_event.set(); self.stats["cancelled"] += 1
+            raise
+        except HTTPException:
+            self.stats["completed"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    def _release(self):
+        self.stats["in_flight"] -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {"max_workers": self.max_workers, "max_queue": self.max_queue, "timeout_sec": self.timeout, **self.stats}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+search_pool = SearchPool(SEARCH_MAX_WORKERS, SEARCH_MAX_QUEUE, SEARCH_TIMEOUT_SEC)
+
+# --- Query Result Cache ---
+# Search results are cached as encoded JSON bodies, keyed by normalized query parameters.
+# Identical requests that arrive while a result is being computed share that computation.
+# All cache state is only touched from the event loop, so no locking is needed.
+CACHE_MAX_BYTES = int(os.environ.get("HERODB_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.environ.get("HERODB_CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL_SEC = float(os.environ.get("HERODB_CACHE_TTL", "600"))
+
+def encode_json(content: Any) -> bytes:
+    """Encodes a payload exactly like FastAPI's default JSONResponse."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+class QueryResultCache:
+    def __init__(self, max_bytes: int, max_entries: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict() # cache_key -> (body, expires_at)
+        self._pending = {} # cache_key -> asyncio.Task shared by coalesced requests
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    async def get_or_compute(self, cache_key: tuple, compute) -> bytes:
+        """Returns the cached body for cache_key, or awaits compute() once for all concurrent callers."""
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            body, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                self.stats["hits"] += 1
+                return body
+            self._remove(cache_key); self.stats["expired"] += 1
+        task = self._pending.get(cache_key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(compute())
+            self._pending[cache_key] = task
+            task.add_done_callback(functools.partial(self._on_computed, cache_key, self.generation))
+        # Shielded so one client disconnecting does not cancel the result for the others.
+        return await asyncio.shield(task)
+
+    def _on_computed(self, cache_key: tuple, generation: int, task: asyncio.Future):
+        if self._pending.get(cache_key) is task: del self._pending[cache_key]
+        if task.cancelled() or task.exception() is not None: return
+        if generation == self.generation: self._store(cache_key, task.result())
+
+    def _store(self, cache_key: tuple, body: bytes):
+        if len(body) > self.max_bytes: return
+        if cache_key in self._entries: self._remove(cache_key)
+        self._entries[cache_key] = (body, time.monotonic() + self.ttl)
+        self.total_bytes += len(body)
+        while self._entries and (self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key); self.stats["evictions"] += 1
+
+    def _remove(self, cache_key: tuple):
+        body, _ = self._entries.pop(cache_key)
+        self.total_bytes -= len(body)
+
+    def invalidate(self):
+        """Drops every entry; results still being computed from old data will not be stored."""
+        self.generation += 1
+        self._entries.clear(); self.total_bytes = 0
+        self._pending.clear()
+        self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "entries": len(self._entries), "bytes": self.total_bytes, "generation": self.generation,
+            "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl_sec": self.ttl, **self.stats
+        }
+
+query_cache = QueryResultCache(CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CACHE_TTL_SEC)
+
+def normalize_keywords(raw: Optional[str]) -> tuple:
+    if not raw: return ()
+    return tuple(sorted({k.strip().lower() for k in raw.split(',') if k.strip()}))
+
+async def cached_search(cache_key: tuple, func, *args, query_echo: Optional[dict] = None) -> Response:
+    """
+    Several raw requests can share one cache key, so the request's own parameters are not part of
+    the cached body: query_echo is spliced in front of it as "query" for each response.
+    """
+    def compute_and_encode(*worker_args):
+        start = time.perf_counter()
+        body = encode_json(func(*worker_args))
+        DATA_PATH_LATENCY.observe(time.perf_counter() - start, path=cache_key[0])
+        return body
+    body = await query_cache.get_or_compute(cache_key, lambda: search_pool.run(compute_and_encode, *args))
+    if query_echo is not None: body = b'{"query":' + encode_json(query_echo) + b"," + body[1:]
+    return Response(content=body, media_type="application/json")
+
+# --- Hero Payloads & Field Projection ---
+# Each hero's full payload and its common GUI slices are encoded once at load time,
+# so the plain lookups only copy bytes. '?fields=' projections are built on demand.
+HERO_SECTIONS = {
+    "special": lambda hero: hero.get("specialId_details", {}),
+    "passives": lambda hero: {
+        "passiveSkills": hero.get("passiveSkills", []),
+        "costumeBonusPassiveSkillIds": hero.get("costumeBonusPassiveSkillIds", []),
+        "costumePassiveSkills": (hero.get("costumeBonusesId_details") or {}).get("passiveSkills", []),
+    },
+}
+
+def build_hero_payloads(hero_data_map: dict) -> dict:
+    """Returns {hero_id: {"full": bytes, <section>: bytes, ...}} for every hero."""
+    payloads = {}
+    for hero_id, hero_data in hero_data_map.items():
+        entry = {"full": encode_json({"hero_id": hero_id, "data": hero_data})}
+        for section, select in HERO_SECTIONS.items():
+            entry[section] = encode_json({"hero_id": hero_id, section: select(hero_data)})
+        payloads[hero_id] = entry
+    return payloads
+
+def parse_fields(fields: Optional[str]) -> List[List[str]]:
+    """Splits 'a.b,c' into [['a', 'b'], ['c']]."""
+    if not fields: return []
+    return [[part for part in path.strip().split('.') if part] for path in fields.split(',') if path.strip()]
+
+def project_fields(data: Any, paths: List[List[str]]) -> Any:
+    """
+    Keeps only the given dotted paths of a nested structure. Lists are projected
+    element-wise, unless the next path segment is a numeric index.
+    """
+    if not paths or any(not path for path in paths): return data
+    if isinstance(data, list):
+        index_paths = {}
+        for path in paths:
+            if path[0].isdigit(): index_paths.setdefault(int(path[0]), []).append(path[1:])
+        if index_paths:
+            return {str(i): project_fields(data[i], sub) for i, sub in index_paths.items() if i < len(data)}
+        return [project_fields(item, paths) for item in data]
+    if not isinstance(data, dict): return None
+    grouped = {}
+    for path in paths: grouped.setdefault(path[0], []).append(path[1:])
+    projected = {}
+    for key, sub_paths in grouped.items():
+        if key in data: projected[key] = project_fields(data[key], sub_paths)
+    return projected
+
+def get_hero(hero_id: str) -> Optional[dict]:
+    if hero_store: return hero_store.hero_data(hero_id)
+    return all_hero_data.get(hero_id) if hero_id in hero_payloads else None
+
+def encode_hero_payload(hero_id: str, section: str, paths: List[List[str]]) -> Optional[bytes]:
+    """
+    Returns the pre-encoded payload when no projection is requested, else encodes the projection;
+    None when the hero does not exist. With SQLite, the hero's row is read once.
+    """
+    start = time.perf_counter()
+    if hero_store:
+        hero_json = hero_store.hero_json(hero_id)
+        if hero_json is None: return None
+        if not paths and section == "full":
+            # The stored JSON uses the response encoding, so it is spliced in without decoding.
+            HERO_PAYLOAD_LOOKUPS.inc(result="sqlite")
+            return b'{"hero_id":' + encode_json(hero_id) + b',"data":' + hero_json.encode("utf-8") + b"}"
+        hero_data = json.loads(hero_json)
+    else:
+        if hero_id not in hero_payloads or hero_id not in all_hero_data: return None
+        if not paths:
+            HERO_PAYLOAD_LOOKUPS.inc(result="preencoded")
+            return hero_payloads[hero_id][section]
+        hero_data = all_hero_data[hero_id]
+    if section == "full":
+        body = encode_json({"hero_id": hero_id, "data": project_fields(hero_data, paths)})
+    else:
+        body = encode_json({"hero_id": hero_id, section: project_fields(HERO_SECTIONS[section](hero_data), paths)})
+    HERO_PAYLOAD_LOOKUPS.inc(result="projected")
+    DATA_PATH_LATENCY.observe(time.perf_counter() - start, path="hero_projection")
+    return body
+
+def hero_exists(hero_id: str) -> bool:
+    if hero_store: return hero_store.has_hero(hero_id)
+    return hero_id in hero_payloads and hero_id in all_hero_data
+
+def hero_response(hero_id: str, section: str, fields: Optional[str]) -> Response:
+    body = encode_hero_payload(hero_id, section, parse_fields(fields))
+    if body is None:
+        HERO_PAYLOAD_LOOKUPS.inc(result="missing")
         raise HTTPException(status_code=404, detail=f"Hero with ID '{hero_id}' not found.")
-    return {"hero_id": hero_id, "data": hero_data}
+    return Response(content=body, media_type="application/json")
 
-@app.get("/api/query")
-def query_hero_data(key: str, keyword: str):
-    extracted_data = []
-    for hero_id, hero_data in all_hero_data.items():
-        if key in hero_data and isinstance(hero_data[key], str) and keyword.lower() in hero_data[key].lower():
-            extracted_data.append({"hero_id": hero_id, "property_block": hero_data})
-            continue
-        found_blocks = []
-        if special_details := hero_data.get("specialId_details"):
-            find_nested_properties(special_details, key, keyword, found_blocks)
-        if found_blocks:
-            for block in found_blocks:
-                extracted_data.append({"hero_id": hero_id, "property_block": block})
-    if not extracted_data:
-        return {"query": {"key": key, "keyword": keyword}, "count": 0, "results": []}
-    return {"query": {"key": key, "keyword": keyword}, "count": len(extracted_data), "results": extracted_data}
+async def respond_off_loop(func, *args):
+    """SQLite reads block, so with hero_store the handler runs in the threadpool; in-memory lookups stay on the loop."""
+    if hero_store: return await run_in_threadpool(func, *args)
+    return func(*args)
 
-@app.get("/api/lang/super_search")
-def super_search_language_db(
-    id_contains: Optional[str] = Query(None, description="Comma-separated keywords for lang_id"),
-    text_contains: Optional[str] = Query(None, description="Comma-separated keywords for EITHER English OR Japanese text")
-):
+# --- Helper Logic for Querying ---
+# Hero searches go through the shared query engine (parser_engine/query_engine.py).
+QUERY_DESCRIPTION = "Structural query, e.g. 'propertyType~chain AND powerMultiplierPerMil>=1000' (see parser_engine/query_engine.py)"
+
+def resolve_hero_query(key: Optional[str], keyword: Optional[str], q: Optional[str]):
+    """Builds a plan from either 'q' or the classic key/keyword pair; returns (plan, query_echo)."""
+    if q and (key or keyword):
+        raise HTTPException(status_code=400, detail="Use either 'q' or 'key'/'keyword', not both.")
+    if q:
+        try: return compile_query(q), {"q": q}
+        except QuerySyntaxError as e: raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+    # An empty keyword is allowed and matches every string value of the key, as /api/query always has.
+    if not key or keyword is None:
+        raise HTTPException(status_code=400, detail="Provide 'q', or both 'key' and 'keyword'.")
+    return keyword_query(key, keyword), {"key": key, "keyword": keyword}
+
+def run_hero_query(plan, cancel_event: threading.Event) -> dict:
+    hero_map, index = (hero_store.hero_map(), hero_store.query_index()) if hero_store else (all_hero_data, hero_query_index)
+    QUERY_INDEX_USAGE.inc(result="narrowed" if plan.candidate_heroes(index) is not None else "full_scan")
+    extracted_data = run_query(plan, hero_map, index=index, cancel_event=cancel_event)
+    return {"count": len(extracted_data), "results": extracted_data}
+
+def search_language_db(id_contains: Optional[str], text_contains: Optional[str], cancel_event: threading.Event) -> dict:
     candidate_keys = list(language_db.keys())
     if id_contains:
         keywords = [k.strip().lower() for k in id_contains.split(',') if k.strip()]
         candidate_keys = [key for key in candidate_keys if all(kw in key.lower() for kw in keywords)]
+    if cancel_event.is_set(): raise SearchCancelled()
     if text_contains:
         keywords = [k.strip().lower() for k in text_contains.split(',') if k.strip()]
-        candidate_keys = [
-            key for key in candidate_keys 
+        matched_keys = []
+        for i, key in enumerate(candidate_keys):
+            if i % 1000 == 0 and cancel_event.is_set(): raise SearchCancelled()
             if all(
                 kw in language_db[key].get("en", "").lower() or 
                 kw in language_db[key].get("ja", "").lower() 
                 for kw in keywords
-            )
-        ]
-    if not candidate_keys:
+            ):
+                matched_keys.append(key)
+        candidate_keys = matched_keys
+    return {key: language_db[key] for key in candidate_keys}
+
+def run_super_search(id_contains: Optional[str], text_contains: Optional[str], cancel_event: threading.Event) -> dict:
+    if hero_store:
+        results = hero_store.search_lang(
+            [k.strip().lower() for k in (id_contains or "").split(',') if k.strip()],
+            [k.strip().lower() for k in (text_contains or "").split(',') if k.strip()],
+            cancel_event
+        )
+    else:
+        results = search_language_db(id_contains, text_contains, cancel_event)
+    if not results:
         raise HTTPException(status_code=404, detail="No language keys found matching all criteria.")
-    results = {key: language_db[key] for key in candidate_keys}
-    return {"query": {"id": id_contains, "text": text_contains}, "count": len(results), "results": results}
\ No newline at end of file
+    return {"count": len(results), "results": results}
+
+# --- Public API Endpoints ---
+# Cheap lookups are 'async def' and are answered directly on the event loop
+# (with the SQLite backend, the ones that read the database go through respond_off_loop).
+
+@app.get("/")
+async def read_root():
+    return {"message": "Welcome to the HeroDB Parser API!"}
+
+@app.get("/api/heroes")
+async def get_all_hero_ids():
+    return {"hero_ids": sorted(await respond_off_loop(hero_store.hero_ids) if hero_store else all_hero_data.keys())}
+
+FIELDS_DESCRIPTION = "Comma-separated dotted paths to include, e.g. 'specialId_details.properties,passiveSkills.id'"
+
+@app.get("/api/hero/{hero_id}")
+async def get_hero_data(hero_id: str, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    return await respond_off_loop(hero_response, hero_id, "full", fields)
+
+@app.get("/api/hero/{hero_id}/{section}")
+async def get_hero_section(hero_id: str, section: str, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    if section not in HERO_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown hero section '{section}'. Available: {', '.join(HERO_SECTIONS)}.")
+    return await respond_off_loop(hero_response, hero_id, section, fields)
+
+@app.get("/api/usage/{entity_id}")
+async def get_entity_usage(entity_id: str):
+    """Heroes referencing a special, property, status effect, familiar, familiar effect or passive, with the paths of the references."""
+    if hero_store:
+        if not hero_store.has_usage: raise HTTPException(status_code=503, detail="The SQLite database has no usage index. Re-export it with hero_main.py --sqlite.")
+        usage = await respond_off_loop(hero_store.entity_usage, entity_id)
+    elif entity_usage is None: raise HTTPException(status_code=503, detail=f"'{USAGE_INDEX_PATH.name}' is not loaded. Run hero_main.py first.")
+    else: usage = entity_usage.get(entity_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No hero references '{entity_id}'.")
+    return {"entity_id": entity_id, "kind": usage["kind"], "hero_count": len(usage["heroes"]), "heroes": usage["heroes"]}
+
+# --- Batch Hero Endpoint ---
+BATCH_MAX_IDS = int(os.environ.get("HERODB_BATCH_MAX_IDS", "500"))
+
+class HeroBatchRequest(BaseModel):
+    ids: List[str] = Field(..., description="Hero IDs to return, in the desired order")
+    fields: Optional[str] = Field(None, description=FIELDS_DESCRIPTION)
+    section: Optional[str] = Field(None, description="Return only this sub-resource of each hero (e.g. 'special', 'passives')")
+    key: Optional[str] = Field(None, description="Query filter: only heroes where this key...")
+    keyword: Optional[str] = Field(None, description="...contains this keyword (same matching as /api/query)")
+    q: Optional[str] = Field(None, description=f"Query filter in the structural query language. {QUERY_DESCRIPTION}")
+    stream: bool = Field(False, description="Stream newline-delimited JSON, one hero per line")
+
+@app.post("/api/heroes/batch")
+async def get_heroes_batch(request: HeroBatchRequest):
+    if len(request.ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids may be requested at once.")
+    section = request.section or "full"
+    if section != "full" and section not in HERO_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown hero section '{section}'. Available: {', '.join(HERO_SECTIONS)}.")
+    plan = None
+    if request.q or request.key or request.keyword is not None:
+        plan, _ = resolve_hero_query(request.key, request.keyword, request.q)
+    paths = parse_fields(request.fields)
+    # Filtering up to BATCH_MAX_IDS heroes (and, with SQLite, reading them) runs on the search pool.
+    found_ids, missing_ids, body = await search_pool.run(run_hero_batch, request.ids, plan, section, paths, request.stream)
+    if request.stream:
+        # A plain generator, so Starlette iterates (and encodes) it in its threadpool.
+        def ndjson_lines():
+            count = 0
+            for hero_id in found_ids:
+                payload = encode_hero_payload(hero_id, section, paths)
+                # A reload can remove a hero after found_ids was built; it is reported as missing.
+                if payload is None: missing_ids.append(hero_id); continue
+                count += 1
+                yield payload + b"\n"
+            yield encode_json({"count": count, "missing": missing_ids}) + b"\n"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    return Response(content=body, media_type="application/json")
+
+def run_hero_batch(ids: List[str], plan, section: str, paths, stream: bool, cancel_event: threading.Event):
+    """Returns (found_ids, missing_ids, body); body is None when the response is streamed."""
+    found_ids, missing_ids = [], []
+    for hero_id in dict.fromkeys(ids):
+        if cancel_event.is_set(): raise SearchCancelled()
+        if plan:
+            hero_data = get_hero(hero_id)
+            if hero_data is None: missing_ids.append(hero_id); continue
+            if not find_matching_blocks(hero_data, [plan])[0]: continue
+        elif not hero_exists(hero_id): missing_ids.append(hero_id); continue
+        found_ids.append(hero_id)
+    if stream: return found_ids, missing_ids, None
+    payloads = []
+    for hero_id in found_ids:
+        payload = encode_hero_payload(hero_id, section, paths)
+        # A reload can remove a hero after the check above; it is reported as missing.
+        if payload is None: missing_ids.append(hero_id); continue
+        payloads.append(payload)
+    body = b"".join([
+        b'{"count":', str(len(payloads)).encode(), b',"missing":', encode_json(missing_ids),
+        b',"heroes":[', b",".join(payloads), b"]}"
+    ])
+    return found_ids, missing_ids, body
+
+@app.get("/api/query")
+async def query_hero_data(
+    key: Optional[str] = Query(None, description="The JSON key to search for (e.g. 'propertyType')"),
+    keyword: Optional[str] = Query(None, description="Keyword the key's value must contain (case-insensitive)"),
+    q: Optional[str] = Query(None, description=QUERY_DESCRIPTION)
+):
+    plan, query_echo = resolve_hero_query(key, keyword, q)
+    # Keyword plans are keyed on their parts; their text is only a rendering and could read like a 'q'.
+    cache_key = ("query", "q", plan.text) if q else ("query", "keyword", key, keyword.lower())
+    return await cached_search(cache_key, run_hero_query, plan, query_echo=query_echo)
+
+@app.get("/api/lang/super_search")
+async def super_search_language_db(
+    id_contains: Optional[str] = Query(None, description="Comma-separated keywords for lang_id"),
+    text_contains: Optional[str] = Query(None, description="Comma-separated keywords for EITHER English OR Japanese text")
+):
+    cache_key = ("super_search", normalize_keywords(id_contains), normalize_keywords(text_contains))
+    return await cached_search(cache_key, run_super_search, id_contains, text_contains,
+                               query_echo={"id": id_contains, "text": text_contains})
+
+@app.get("/api/status/search_pool")
+async def get_search_pool_status():
+    return search_pool.snapshot()
+
+@app.get("/api/status/cache")
+async def get_cache_status():
+    return query_cache.snapshot()
+
+def collect_runtime_metrics():
+    pool = search_pool.snapshot(); cache = query_cache.snapshot()
+    pool_gauge = Gauge("herodb_search_pool_tasks", "Search pool tasks currently waiting or running.", ["state"])
+    pool_gauge.set(pool["queued"], state="queued"); pool_gauge.set(pool["in_flight"], state="in_flight")
+    pool_limits = Gauge("herodb_search_pool_limit", "Configured search pool limits.", ["limit"])
+    pool_limits.set(pool["max_workers"], limit="max_workers"); pool_limits.set(pool["max_queue"], limit="max_queue")
+    pool_outcomes = Counter("herodb_search_pool_outcomes_total", "Search pool task outcomes.", ["outcome"])
+    for outcome in ("completed", "rejected", "timed_out", "cancelled", "failed"): pool_outcomes.inc(pool[outcome], outcome=outcome)
+    cache_events = Counter("herodb_query_cache_events_total", "Query result cache events.", ["event"])
+    for event in ("hits", "misses", "coalesced", "evictions", "expired", "invalidations"): cache_events.inc(cache[event], event=event)
+    cache_size = Gauge("herodb_query_cache_size", "Query result cache occupancy.", ["unit"])
+    cache_size.set(cache["entries"], unit="entries"); cache_size.set(cache["bytes"], unit="bytes")
+    lookups = cache["hits"] + cache["coalesced"] + cache["misses"]
+    hit_ratio = Gauge("herodb_query_cache_hit_ratio", "Share of search requests answered without a new computation.")
+    hit_ratio.set((cache["hits"] + cache["coalesced"]) / lookups if lookups else 0)
+    return [pool_gauge, pool_limits, pool_outcomes, cache_events, cache_size, hit_ratio]
+
+metrics.register_collector(collect_runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/reload")
+async def reload_data():
+    """Re-reads the data files from disk and invalidates every cached search result."""
+    await asyncio.get_running_loop().run_in_executor(None, read_data_files)
+    query_cache.invalidate()
+    if hero_store:
+        return {"message": "Data reloaded.", "hero_count": hero_store.hero_count, "language_key_count": hero_store.lang_key_count}
+    return {"message": "Data reloaded.", "hero_count": len(all_hero_data), "language_key_count": len(language_db)}
@@ -0,0 +1,156 @@
+# packages/api_server/sqlite_store.py
+# Read-only access to the database written by 'hero_main.py --sqlite', used when the API
+# runs with HERODB_BACKEND=sqlite. Nothing is loaded up front: heroes are fetched by primary
+# key, hero queries are narrowed through the stored inverted index, and language searches
+# go through the FTS5 trigram index.
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from parser_engine.query_engine import QueryCancelled
+
+MIN_SCHEMA_VERSION = 2
+FTS_MIN_TERM_LENGTH = 3 # the trigram tokenizer cannot match shorter terms
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+class SqliteQueryIndex:
+    """
+    Presents the block_keys/block_values tables through the attributes the query engine's
+    QueryIndex exposes. Each key is read once per instance, so create one per query.
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.values_by_key = _LazyKeyMap(self._load_values)
+        self.heroes_by_key = _LazyKeyMap(self._load_heroes)
+
+    def _load_values(self, key: str) -> Dict[object, Set[str]]:
+        values = {}
+        for kind, value, hero_id in self.conn.execute("SELECT kind, value, hero_id FROM block_values WHERE key = ?", (key,)):
+            if kind == "b": value = bool(value)
+            elif kind == "n": value = float(value)
+            values.setdefault((kind, value), set()).add(hero_id)
+        return values
+
+    def _load_heroes(self, key: str) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT hero_id FROM block_keys WHERE key = ?", (key,))}
+
+class _LazyKeyMap:
+    def __init__(self, loader):
+        self._loader = loader
+        self._cache = {}
+
+    def get(self, key, default=None):
+        if key not in self._cache: self._cache[key] = self._loader(key)
+        return self._cache[key] or default
+
+class SqliteHeroMap(Mapping):
+    """A hero_id -> hero_data mapping in export order that decodes each hero only when it is accessed."""
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __getitem__(self, hero_id: str) -> dict:
+        row = self.conn.execute("SELECT data_json FROM heroes WHERE hero_id = ?", (hero_id,)).fetchone()
+        if row is None: raise KeyError(hero_id)
+        return json.loads(row[0])
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self.conn.execute("SELECT hero_id FROM heroes ORDER BY rowid"))
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM heroes").fetchone()[0]
+
+class SqliteStore:
+    """
+    One read-only connection per thread (event loop and each search worker), opened on first
+    use and kept for the lifetime of the store.
+    """
+    def __init__(self, path: Path):
+        if not path.exists(): raise FileNotFoundError(f"SQLite database not found: {path}")
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        meta = dict(self.connection().execute("SELECT key, value FROM meta"))
+        if int(meta.get("schema_version", 0)) < MIN_SCHEMA_VERSION:
+            raise ValueError(f"'{path.name}' has schema version {meta.get('schema_version')}; re-export it with hero_main.py --sqlite.")
+        self.hero_count = int(meta.get("hero_count", 0))
+        self.lang_key_count = int(meta.get("lang_key_count", 0))
+        self.has_fts = meta.get("lang_fts") == "1"
+        self.has_usage = meta.get("entity_usage") == "1"
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._lock: self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock: connections, self._connections = self._connections, []
+        for conn in connections: conn.close()
+
+    # --- Heroes ---
+    def hero_ids(self) -> List[str]:
+        return [row[0] for row in self.connection().execute("SELECT hero_id FROM heroes ORDER BY rowid")]
+
+    def has_hero(self, hero_id: str) -> bool:
+        return self.connection().execute("SELECT 1 FROM heroes WHERE hero_id = ?", (hero_id,)).fetchone() is not None
+
+    def hero_json(self, hero_id: str) -> Optional[str]:
+        row = self.connection().execute("SELECT data_json FROM heroes WHERE hero_id = ?", (hero_id,)).fetchone()
+        return row[0] if row else None
+
+    def hero_data(self, hero_id: str) -> Optional[dict]:
+        data_json = self.hero_json(hero_id)
+        return json.loads(data_json) if data_json is not None else None
+
+    def hero_map(self) -> SqliteHeroMap:
+        return SqliteHeroMap(self.connection())
+
+    def query_index(self) -> SqliteQueryIndex:
+        return SqliteQueryIndex(self.connection())
+
+    # --- Entity Usage ---
+    def entity_usage(self, entity_id: str) -> Optional[dict]:
+        """{"kind", "heroes": {hero_id: [paths]}} like entity_usage.json, or None if nothing references the id."""
+        if not self.has_usage:
+            raise ValueError(f"'{self.path.name}' has no usage index; re-export it with hero_main.py --sqlite.")
+        heroes, kind = {}, None
+        for kind, hero_id, path in self.connection().execute(
+                "SELECT kind, hero_id, path FROM entity_usage WHERE entity_id = ? ORDER BY rowid", (entity_id,)):
+            heroes.setdefault(hero_id, []).append(path)
+        return {"kind": kind, "heroes": heroes} if heroes else None
+
+    # --- Language ---
+    def search_lang(self, id_keywords: List[str], text_keywords: List[str], cancel_event: threading.Event) -> Dict[str, dict]:
+        """
+        Keys whose id contains every id keyword and whose English or Japanese text contains every
+        text keyword (all lowercased). Keywords long enough for the trigram index narrow the rows
+        in SQL; every row is then checked exactly as the in-memory search would check it.
+        """
+        terms = [f"key:{_fts_phrase(kw)}" for kw in id_keywords if len(kw) >= FTS_MIN_TERM_LENGTH]
+        terms += [f"{{en ja}}:{_fts_phrase(kw)}" for kw in text_keywords if len(kw) >= FTS_MIN_TERM_LENGTH]
+        if self.has_fts and terms:
+            sql = ("SELECT lang.key, lang.en, lang.ja FROM lang_fts JOIN lang ON lang.rowid = lang_fts.rowid "
+                   "WHERE lang_fts MATCH ? ORDER BY lang.rowid")
+            rows = self.connection().execute(sql, (" AND ".join(terms),))
+        else:
+            rows = self.connection().execute("SELECT key, en, ja FROM lang ORDER BY rowid")
+        results = {}
+        for i, (key, en, ja) in enumerate(rows):
+            if i % 1000 == 0 and cancel_event.is_set(): raise QueryCancelled()
+            lowered_key = key.lower()
+            if not all(kw in lowered_key for kw in id_keywords): continue
+            en, ja = en or "", ja or ""
+            lowered_en, lowered_ja = en.lower(), ja.lower()
+            if all(kw in lowered_en or kw in lowered_ja for kw in text_keywords):
+                results[key] = {"en": en, "ja": ja}
+        return results
@@ -0,0 +1,84 @@
+# diagnostics.py
+# Structured diagnostics for Phase 2. Parsers return DiagnosticEvent objects instead of
+# free-form warning strings; the orchestrator passes them to a Diagnostics instance, which
+# counts every event per code and per parser but only keeps/writes a sample of them, so
+# memory stays constant no matter how many heroes produce the same warning.
+
+import json
+from collections import Counter
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+UNCLASSIFIED = "UNCLASSIFIED"
+
+class DiagnosticEvent(NamedTuple):
+    parser: str
+    code: str
+    message: str
+    block_id: Optional[str] = None
+    level: str = "warning"
+    data: Optional[dict] = None
+
+    def __str__(self):
+        # The same "[parser]: message" form the plain warning strings used.
+        return f"[{self.parser}]: {self.message}"
+
+def warning_event(parser: str, code: str, message: str, block_id=None) -> DiagnosticEvent:
+    return DiagnosticEvent(parser, code, message, block_id)
+
+def event_from_string(warning: str, parser: str = None) -> DiagnosticEvent:
+    """Wraps a legacy "[parser]: message" string so older call sites still get counted."""
+    if warning.startswith("[") and "]" in warning:
+        prefix, _, message = warning.partition("]")
+        return DiagnosticEvent(prefix[1:], UNCLASSIFIED, message.lstrip(": "))
+    return DiagnosticEvent(parser or "unknown", UNCLASSIFIED, warning)
+
+class Diagnostics:
+    """
+    Every emitted event at or above `level` is counted. Of those, the first `sample_first`
+    events of each code and then every `sample_every`-th one (0 = none) are written to the
+    JSONL file at `path`. Only the first `sample_first` per code are kept in memory;
+    sample_first=None keeps (and writes) every event.
+    phase_two_parse_skills sets hero_id/parser before each parser call, as for PlaceholderStats.
+    """
+    def __init__(self, path: Path = None, level: str = "warning", sample_first: Optional[int] = 20, sample_every: int = 100):
+        if level not in LEVELS: raise ValueError(f"Unknown diagnostics level '{level}' (expected one of {', '.join(LEVELS)})")
+        self.path = path; self.level = level; self.threshold = LEVELS[level]
+        self.sample_first = sample_first; self.sample_every = sample_every
+        self.hero_id = None; self.parser = None
+        self.by_code = Counter(); self.by_parser = Counter(); self.by_level = Counter()
+        self.samples = [] # (hero_id, event) for the first sample_first events of each code (all with None)
+        self.written = 0
+        self._file = open(path, "w", encoding="utf-8") if path else None
+
+    def enabled_for(self, level: str) -> bool:
+        """Lets callers skip building expensive debug payloads nobody will record."""
+        return LEVELS[level] >= self.threshold
+
+    def emit(self, event, hero_id: str = None):
+        if isinstance(event, str): event = event_from_string(event, self.parser)
+        if LEVELS.get(event.level, 30) < self.threshold: return
+        hero_id = hero_id or self.hero_id
+        self.by_code[event.code] += 1; self.by_parser[event.parser] += 1; self.by_level[event.level] += 1
+        seen = self.by_code[event.code]
+        if self.sample_first is None or seen <= self.sample_first:
+            self.samples.append((hero_id, event))
+        elif not self.sample_every or (seen - self.sample_first) % self.sample_every:
+            return
+        if self._file:
+            record = {"level": event.level, "code": event.code, "parser": event.parser, "hero_id": hero_id,
+                      "block_id": event.block_id, "message": event.message, "seq": seen}
+            if event.data is not None: record["data"] = event.data
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self.written += 1
+
+    def extend(self, events, hero_id: str = None):
+        for event in events or (): self.emit(event, hero_id)
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_code.values())
+
+    def close(self):
+        if self._file: self._file.close(); self._file = None
@@ -0,0 +1,95 @@
+# exception_rules.py
+# Compiles the hero parameter exception rules from every source into one lookup table.
+#
+# Sources, highest precedence first:
+#   1. exception_hero_rules.csv rows with a hero_id   (hero specific)
+#   2. exception_hero_rules.csv rows without one      (common)
+#   3. config.json "EXCEPTION_RULES"                  (common)
+# Rules are validated once when the table is built, and fixed values are parsed up front,
+# so find_and_calculate_value only does a dict lookup per placeholder. Every calc other than
+# "fixed" looks the value up by key; a calc outside VALID_CALCS is reported but still applied.
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+VALID_CALCS = {"fixed", "direct", ""}
+
+def _parse_fixed_value(value):
+    if not isinstance(value, str): return value
+    try: return int(value)
+    except ValueError:
+        try: return float(value)
+        except ValueError: return value
+
+class ExceptionRule(NamedTuple):
+    placeholder: str
+    calc: str
+    key: Optional[str]
+    value: object
+    source: str
+    suffix: Optional[str] # lowercased key, matched against the end of each flattened key
+
+    def find_key(self, flat_data: dict) -> Optional[str]:
+        """
+        The single flattened key ending with the rule's key (ignoring case, so 'reallocationCount'
+        also matches 'customReallocationCount'), or None if there are zero or several.
+        """
+        suffix = self.suffix
+        found = None
+        for flat_key in flat_data:
+            if flat_key.lower().endswith(suffix):
+                if found is not None: return None
+                found = flat_key
+        return found
+
+def compile_rule(placeholder: str, raw_rule: dict, source: str) -> ExceptionRule:
+    """Validates one raw rule (a CSV row or a config.json entry). Raises ValueError when it cannot be applied."""
+    calc = str(raw_rule.get("calc") or "").strip().lower()
+    key = str(raw_rule.get("key") or "").strip() or None
+    if calc == "fixed":
+        value = raw_rule.get("value")
+        if value is None or (isinstance(value, str) and not value.strip()): raise ValueError("'fixed' rule without a value")
+        return ExceptionRule(placeholder, calc, key, _parse_fixed_value(value.strip() if isinstance(value, str) else value), source, None)
+    if not key: raise ValueError("rule without a key")
+    return ExceptionRule(placeholder, calc, key, None, source, key.lower())
+
+class RuleTable:
+    """(hero_id, PLACEHOLDER) -> ExceptionRule, with common rules stored under hero_id None."""
+    def __init__(self):
+        self.rules: Dict[Tuple[Optional[str], str], ExceptionRule] = {}
+        self.errors = []
+        self.warnings = []
+
+    def add(self, hero_id: Optional[str], placeholder: str, raw_rule: dict, source: str):
+        placeholder = placeholder.strip().upper()
+        if not placeholder: self.errors.append(f"{source}: rule without a placeholder"); return
+        try: rule = compile_rule(placeholder, raw_rule, source)
+        except ValueError as e: self.errors.append(f"{source}: {placeholder} skipped, {e}"); return
+        if rule.calc not in VALID_CALCS: self.warnings.append(f"{source}: {placeholder} has unknown calc '{rule.calc}', used as a key lookup")
+        # Sources are added from highest to lowest precedence, so the first rule for a slot wins.
+        slot = (hero_id or None, placeholder)
+        if slot not in self.rules: self.rules[slot] = rule
+
+    def lookup(self, hero_id: str, placeholder_upper: str) -> Optional[ExceptionRule]:
+        return self.rules.get((hero_id, placeholder_upper)) or self.rules.get((None, placeholder_upper))
+
+    def __len__(self):
+        return len(self.rules)
+
+def build_rule_table(hero_rules: dict) -> RuleTable:
+    """Builds the table from rules["hero_rules"] ({"specific": {...}, "common": {...}, "config": {...}})."""
+    table = RuleTable()
+    for hero_id, placeholders in hero_rules.get("specific", {}).items():
+        for placeholder, raw_rule in placeholders.items():
+            table.add(hero_id, placeholder, raw_rule, "exception_hero_rules.csv")
+    for placeholder, raw_rule in hero_rules.get("common", {}).items():
+        table.add(None, placeholder, raw_rule, "exception_hero_rules.csv")
+    for placeholder, raw_rule in hero_rules.get("config", {}).items():
+        if not isinstance(raw_rule, dict): table.errors.append(f"config.json: {placeholder} skipped, not an object"); continue
+        table.add(None, placeholder, raw_rule, "config.json")
+    return table
+
+def get_rule_table(rules: dict) -> RuleTable:
+    """Returns the compiled table for a rules dict, building and caching it on first use."""
+    table = rules.get("hero_rule_table")
+    if table is None: table = rules["hero_rule_table"] = build_rule_table(rules.get("hero_rules", {}))
+    return table
@@ -3,12 +3,24 @@
 
 import csv
 import json
-import re
 from pathlib import Path
 import glob
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 import pandas as pd
 
+# Imported flat by hero_main.py and as 'parser_engine.hero_data_loader' by the API server.
+try:
+    from override_json import iter_override_entries
+    from exception_rules import get_rule_table
+    from hero_stats import HeroStatsTable, STAT_COLUMN_RE
+except ImportError:
+    from parser_engine.override_json import iter_override_entries
+    from parser_engine.exception_rules import get_rule_table
+    from parser_engine.hero_stats import HeroStatsTable, STAT_COLUMN_RE
+
 # --- Constants ---
 # Find the project root by going up from the current script's directory.
 # This makes the script runnable from anywhere within the project.
@@ -43,7 +55,8 @@ def load_rules_from_csvs(script_dir: Path) -> dict:
     print("--- Loading Exception Rules from CSVs ---")
     rules = {
         "lang_overrides": {"specific": {}, "common": {}},
-        "hero_rules": {"specific": {}, "common": {}}
+        "hero_rules": {"specific": {}, "common": {}, "config": {}},
+        "additional_skills": {}
     }
     
     # --- Load Language ID Overrides ---
@@ -100,12 +113,47 @@ def load_rules_from_csvs(script_dir: Path) -> dict:
                 print(f" -> Loaded {count} hero parameter rules.")
         except Exception as e:
             print(f"Warning: Could not process '{hero_rules_path.name}'. Error: {e}")
-            
+
+    # --- Load config.json Rules ---
+    config_path = script_dir / "config.json"
+    if config_path.exists():
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            rules["hero_rules"]["config"] = config.get("EXCEPTION_RULES", {})
+            rules["additional_skills"] = config.get("ADDITIONAL_SKILLS", {})
+            print(f" -> Loaded {len(rules['hero_rules']['config'])} exception rules from '{config_path.name}'.")
+        except Exception as e:
+            print(f"Warning: Could not process '{config_path.name}'. Error: {e}")
+
+    # Compile every hero rule source into one precedence-resolved table and report bad rules now.
+    rule_table = get_rule_table(rules)
+    for error in rule_table.errors: print(f"Warning: Invalid exception rule in {error}")
+    for warning in rule_table.warnings: print(f"Warning: Exception rule in {warning}")
+    print(f" -> Compiled {len(rule_table)} hero parameter rules.")
     return rules
 
 
-def read_csv_to_dict(file_path: Path) -> dict:
-    """A helper function to read a two-column CSV (KEY, TEXT) into a dictionary."""
+class LangKeyAllowlist(NamedTuple):
+    """Language keys to keep: any key starting with one of prefixes, containing one of substrings, or listed in keys."""
+    prefixes: tuple = ()
+    substrings: tuple = ()
+    keys: frozenset = frozenset()
+
+    def allows(self, key: str) -> bool:
+        return key.startswith(self.prefixes) or key in self.keys or any(s in key for s in self.substrings)
+
+    def with_rules(self, rules: dict) -> "LangKeyAllowlist":
+        """Adds the lang ids named by exception_lang_rules.csv and the ADDITIONAL_SKILLS prefixes of config.json."""
+        overrides = rules.get("lang_overrides", {})
+        keys = set(overrides.get("common", {}).values())
+        for hero_overrides in overrides.get("specific", {}).values(): keys.update(hero_overrides.values())
+        prefixes = tuple(skill["prefix"] for skill in rules.get("additional_skills", {}).values() if skill.get("prefix"))
+        return self._replace(prefixes=self.prefixes + prefixes, keys=self.keys | keys)
+
+
+def read_csv_to_dict(file_path: Path, allowlist: LangKeyAllowlist = None) -> dict:
+    """A helper function to read a two-column CSV (KEY, TEXT) into a dictionary, skipping keys the allowlist rejects."""
     if not file_path.exists(): raise FileNotFoundError(f"CSV not found: {file_path}")
     data_dict = {}
     with open(file_path, "r", encoding="utf-8", newline="") as f:
@@ -116,55 +164,57 @@ def read_csv_to_dict(file_path: Path) -> dict:
             key_index, text_index = header.index('KEY'), header.index('TEXT')
         except ValueError: raise ValueError(f"CSV must have 'KEY' and 'TEXT' columns: {file_path.name}")
         for row in reader:
-            if len(row) > max(key_index, text_index): data_dict[row[key_index]] = row[text_index]
+            if len(row) <= max(key_index, text_index): continue
+            if allowlist is not None and not allowlist.allows(row[key_index]): continue
+            data_dict[row[key_index]] = row[text_index]
     return data_dict
 
 
-def apply_overrides(data_dict: dict, override_list: list) -> int:
-    """A helper function to apply language overrides."""
-    count = 0
-    if not override_list: return 0
-    for entry in override_list:
-        if "key" in entry and "text" in entry: data_dict[entry["key"]] = entry["text"]
-    return count
-
-
-def load_languages() -> dict:
-    """Loads and merges English and Japanese language data."""
-    print("--- Loading Language Data ---")
-    en_dict = read_csv_to_dict(CSV_EN_PATH)
-    ja_dict = read_csv_to_dict(CSV_JA_PATH)
+def load_languages(allowlist: LangKeyAllowlist = None) -> dict:
+    """
+    Loads and merges English and Japanese language data. With an allowlist, other keys are
+    dropped while the CSV rows and overrides are read, so they are never stored.
+    """
+    print(f"--- Loading Language Data{'' if allowlist is None else ' (allowlisted keys only)'} ---")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        en_future, ja_future = pool.submit(read_csv_to_dict, CSV_EN_PATH, allowlist), pool.submit(read_csv_to_dict, CSV_JA_PATH, allowlist)
+        en_dict, ja_dict = en_future.result(), ja_future.result()
     if JSON_OVERRIDE_PATH.exists():
-        with open(JSON_OVERRIDE_PATH, "r", encoding="utf-8") as f: broken_json_string = f.read()
-        def fix_newlines(m): return '"text": "' + m.group(1).replace(chr(13), "").replace(chr(10), "\\n") + '"'
-        fixed_json_string = re.sub(r'"text":\s*"((?:\\"|[^"])*)"', fix_newlines, broken_json_string, flags=re.DOTALL)
-        try: override_data = json.loads(fixed_json_string)
-        except json.JSONDecodeError as e: raise e
-        overrides_config = override_data.get("languageOverridesConfig", {}).get("overrides", {})
-        apply_overrides(en_dict, overrides_config.get("English", {}).get("overrideEntries", []))
-        apply_overrides(ja_dict, overrides_config.get("Japanese", {}).get("overrideEntries", []))
+        lang_dicts = {"English": en_dict, "Japanese": ja_dict}
+        for language, entry in iter_override_entries(JSON_OVERRIDE_PATH):
+            if allowlist is not None and not allowlist.allows(entry["key"]): continue
+            lang_dicts[language][entry["key"]] = entry["text"]
     merged_lang_dict = {}
-    for key in set(en_dict.keys()) | set(ja_dict.keys()):
+    # File order (English keys, then Japanese-only ones) rather than a set union, so the key order
+    # the parsers' candidate searches see does not change from run to run or with the allowlist.
+    for key in dict.fromkeys([*en_dict, *ja_dict]):
         merged_lang_dict[key] = {"en": en_dict.get(key, ""), "ja": ja_dict.get(key, "")}
     print(f" -> Unified language DB created with {len(merged_lang_dict)} keys.")
     return merged_lang_dict
     
 
-def load_game_data() -> dict:
-    """Loads all core game data JSONs into a structured dictionary."""
-    print("\n--- Loading Core Game Data ---")
+def load_game_data(data_dir: Path = DATA_DIR) -> dict:
+    """
+    Loads all core game data JSONs into a structured dictionary. data_dir can point to
+    another version's folder holding characters.json, specials.json and battle.json.
+    """
+    print(f"\n--- Loading Core Game Data{'' if data_dir == DATA_DIR else f' from {data_dir}'} ---")
     game_data = {}
     def load_json(p):
         if not p.exists(): raise FileNotFoundError(f"Game data not found: {p}")
         with open(p, 'r', encoding='utf-8') as f: return json.load(f)
     
-    game_data['heroes'] = load_json(CHARACTERS_PATH).get('charactersConfig', {}).get('heroes', [])
+    # The three files are independent, so they are read and parsed at the same time.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        characters, specials, battle = pool.map(load_json, [data_dir / p.name for p in (CHARACTERS_PATH, SPECIALS_PATH, BATTLE_PATH)])
+
+    game_data['heroes'] = characters.get('charactersConfig', {}).get('heroes', [])
     
-    specials_config = load_json(SPECIALS_PATH).get('specialsConfig', {})
+    specials_config = specials.get('specialsConfig', {})
     game_data['character_specials'] = {cs['id']: cs for cs in specials_config.get('characterSpecials', [])}
     game_data['special_properties'] = {p['id']: p for p in specials_config.get('specialProperties', [])}
     
-    battle_config = load_json(BATTLE_PATH).get('battleConfig', {})
+    battle_config = battle.get('battleConfig', {})
     game_data['status_effects'] = {se['id']: se for se in battle_config.get('statusEffects', [])}
     game_data['familiars'] = {f['id']: f for f in battle_config.get('familiars', [])}
     game_data['familiar_effects'] = {fe['id']: fe for fe in battle_config.get('familiarEffects', [])}
@@ -192,8 +242,12 @@ def load_game_data() -> dict:
     return game_data
 
 
-def load_hero_stats_from_csv(base_dir: Path, pattern: str) -> dict:
-    """Finds the latest hero stats CSV and loads it into a dictionary."""
+def has_hero_stats_csv(base_dir: Path, pattern: str) -> bool:
+    return bool(glob.glob(str(base_dir / f"*{pattern}")))
+
+
+def load_hero_stats_from_csv(base_dir: Path, pattern: str) -> HeroStatsTable:
+    """Finds the latest hero stats CSV and loads its stat columns into a HeroStatsTable (see hero_stats.py)."""
     print("\n--- Loading Hero Stats from CSV ---")
     try:
         search_path = str(base_dir / f"*{pattern}")
@@ -202,11 +256,45 @@ def load_hero_stats_from_csv(base_dir: Path, pattern: str) -> dict:
             raise FileNotFoundError(f"No hero stats CSV found in {base_dir} matching pattern '{pattern}'")
         latest_file = max(list_of_files, key=os.path.getctime)
         print(f"Found latest stats file: {Path(latest_file).name}")
-        df = pd.read_csv(latest_file)
+        df = pd.read_csv(latest_file, usecols=lambda c: c in ('ID', 'Name') or bool(STAT_COLUMN_RE.match(c)))
         if 'ID' not in df.columns: raise ValueError("Stats CSV must contain an 'ID' column.")
-        hero_stats_db = df.set_index('ID').to_dict('index')
+        hero_stats_db = HeroStatsTable.from_dataframe(df)
         print(f" -> Loaded stats for {len(hero_stats_db)} heroes.")
         return hero_stats_db
     except Exception as e:
         print(f"FATAL: Could not load hero stats CSV. Error: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def load_all_sources(script_dir: Path, data_dir: Path = DATA_DIR, include_game_data: bool = True,
+                     lang_allowlist: LangKeyAllowlist = None) -> dict:
+    """
+    Loads the exception rules, the language DB and (unless include_game_data is False) the game
+    data JSONs and the hero stats CSV concurrently, and reports how long each source took.
+    Returns {"rules", "languages", "game_data", "hero_stats"}; an error in any source is raised.
+    lang_allowlist restricts the language DB; it is extended with the lang ids the rules name.
+    """
+    futures = {}
+    loaders = {
+        "rules": lambda: load_rules_from_csvs(script_dir),
+        # The rules load in a few milliseconds, so waiting for them here costs nothing.
+        "languages": load_languages if lang_allowlist is None else
+                     lambda: load_languages(lang_allowlist.with_rules(futures["rules"].result()[0])),
+    }
+    if include_game_data:
+        loaders["game_data"] = lambda: load_game_data(data_dir)
+        loaders["hero_stats"] = lambda: load_hero_stats_from_csv(data_dir, HERO_STATS_CSV_PATTERN)
+
+    def timed(loader):
+        started = time.perf_counter()
+        return loader(), time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        for name, loader in loaders.items(): futures[name] = pool.submit(timed, loader)
+        results = {name: future.result() for name, future in futures.items()}
+    elapsed = time.perf_counter() - started
+
+    print(f"\n--- ⏱️ Loaded {len(results)} input sources in {elapsed:.2f}s ---")
+    for name, (_, seconds) in results.items(): print(f" -> {name:<12} {seconds:6.2f}s")
+    return {name: value for name, (value, _) in results.items()}
@@ -1,23 +1,25 @@
 # hero_main.py (Final Architecture Version)
 # This is the main entry point for the Hero Skill Data Processor.
 
+import argparse
 import csv
+import difflib
+import hashlib
 import json
 import traceback
-from collections import Counter
 from pathlib import Path
 import pandas as pd
-import re
 from pprint import pformat
 
 # --- Import custom modules ---
 from hero_data_loader import (
-    load_rules_from_csvs, load_languages, load_game_data, load_hero_stats_from_csv,
+    load_all_sources, LangKeyAllowlist, load_game_data, load_hero_stats_from_csv, has_hero_stats_csv,
     DATA_DIR, OUTPUT_DIR, SCRIPT_DIR as LOADER_SCRIPT_DIR, HERO_STATS_CSV_PATTERN
 )
 # Import core tools from the central parser file
 from hero_parser import (
-    get_full_hero_data, get_hero_final_stats,
+    get_full_hero_data, get_hero_final_stats, PlaceholderStats, set_placeholder_stats, set_level_table,
+    PARSER_LANG_PREFIXES, PARSER_LANG_SUBSTRINGS, build_lang_key_tokens,
     parse_direct_effect # Direct effect is simple and widely used by other parsers
 )
 # --- NEW: Import all specialized parsers from the 'parsers' package ---
@@ -27,6 +29,13 @@ from parsers.parse_status_effects import parse_status_effects
 from parsers.parse_familiars import parse_familiars
 from parsers.parse_passive_skills import parse_passive_skills
 from parsers.parse_chain_strike import parse_chain_strike
+from sqlite_export import write_sqlite_db
+from output_delta import write_output_delta, write_version_comparison
+from output_shards import write_json_shards
+from diagnostics import Diagnostics, LEVELS
+from usage_index import UsageIndex, USAGE_INDEX_FILENAME, write_usage_index
+from level_tables import LevelTable, write_level_tables
+from memprofile import MemoryProfiler
 
 # --- Constants & Paths ---
 SCRIPT_DIR = Path(__file__).parent
@@ -34,7 +43,15 @@ FINAL_CSV_PATH = SCRIPT_DIR / "hero_skill_output.csv"
 DEBUG_CSV_PATH = SCRIPT_DIR / "hero_skill_output_debug.csv"
 PARAM_LOG_PATH = SCRIPT_DIR / "familiar_parameter_log.csv" 
 DEBUG_JSON_PATH = OUTPUT_DIR / "debug_hero_data.json"
-FAMILIAR_LOG_PATH = OUTPUT_DIR / "familiar_debug_log.txt"
+DIAGNOSTICS_PATH = OUTPUT_DIR / "hero_diagnostics.jsonl"
+SQLITE_DB_PATH = OUTPUT_DIR / "hero_data.sqlite"
+OUTPUT_HASHES_PATH = OUTPUT_DIR / "hero_output_hashes.json"
+OUTPUT_DELTA_PATH = OUTPUT_DIR / "hero_output_delta.json"
+VERSIONS_OUTPUT_DIR = OUTPUT_DIR / "versions"
+LEVEL_TABLES_PATH = OUTPUT_DIR / "hero_level_values.json"
+JSON_SHARDS_DIR = OUTPUT_DIR / "heroes_json"
+MEMPROFILE_PATH = OUTPUT_DIR / "hero_memprofile.json"
+SINGLE_HERO_OUTPUT_DIR = OUTPUT_DIR / "single_hero"
 
 # --- Formatting & Output Functions ---
 
@@ -119,15 +136,8 @@ def _format_final_description(skill_descriptions: dict, lang: str, skill_types_t
             
     return output_items
 
-def write_final_csv(processed_data: list, output_path: Path):
-    """
-    Writes the main, human-readable CSV, handling the new structured skill format.
-    """
-    print(f"\n--- Writing final results to {output_path.name} (and potential chunks) ---")
-    if not processed_data:
-        print("Warning: No data to write.")
-        return
-        
+def render_final_rows(processed_data: list) -> list:
+    """Renders each parsed hero into its final CSV row (passive/special text and up to 3 tooltips per language)."""
     output_rows = []
     ss_skill_types = ['directEffect', 'clear_buffs', 'properties', 'statusEffects', 'familiars']
     
@@ -160,7 +170,20 @@ def write_final_csv(processed_data: list, output_path: Path):
             row[f'extra_ja_{i+1}'] = all_tooltips_ja[i] if i < len(all_tooltips_ja) else ""
 
         output_rows.append(row)
+    return output_rows
+
+
+def write_final_csv(processed_data: list, output_path: Path) -> list:
+    """
+    Writes the main, human-readable CSV, handling the new structured skill format.
+    Returns the rendered rows, which the run-to-run delta is computed from.
+    """
+    print(f"\n--- Writing final results to {output_path.name} (and potential chunks) ---")
+    if not processed_data:
+        print("Warning: No data to write.")
+        return []
         
+    output_rows = render_final_rows(processed_data)
     try:
         df = pd.DataFrame(output_rows)
         column_order = [
@@ -189,6 +212,7 @@ def write_final_csv(processed_data: list, output_path: Path):
                 
     except Exception as e:
         print(f"FATAL: Failed to write final CSV: {e}")
+    return output_rows
 
 
 def write_debug_csv(processed_data: list, output_path: Path):
@@ -249,39 +273,47 @@ def write_debug_json(debug_data: dict, output_path: Path):
         print(f"FATAL: Failed to write debug JSON: {e}")
 
 # --- Two-Phase Processing Functions ---
-def phase_one_integrate_data(game_db: dict, output_path: Path):
+def phase_one_integrate_data(game_db: dict, output_path: Path) -> UsageIndex:
     """
     Phase 1: Loads all heroes, resolves all data dependencies,
     and writes the complete, unified data to debug_hero_data.json.
+    The heroes and paths referencing each master_db id are written next to it (entity_usage.json).
     """
     print("\n--- Phase 1: Integrating hero data and creating debug file ---")
     all_heroes = game_db.get('heroes', [])
     all_heroes_debug_data = {}
+    usage = UsageIndex()
     total_heroes = len(all_heroes)
     for i, hero in enumerate(all_heroes):
         hero_id = hero.get("id", "UNKNOWN")
         print(f"\r[{i+1}/{total_heroes}] Integrating data for: {hero_id.ljust(40)}", end="")
-        full_hero_data = get_full_hero_data(hero, game_db)
+        usage.hero_id = hero_id
+        full_hero_data = get_full_hero_data(hero, game_db, usage)
         all_heroes_debug_data[hero_id] = full_hero_data
     
     write_debug_json(all_heroes_debug_data, output_path)
+    write_usage_index(usage, game_db, output_path.with_name(USAGE_INDEX_FILENAME))
     print(f"\n--- Phase 1 Complete. {len(all_heroes_debug_data)} heroes integrated. ---")
+    return usage
 
 def phase_two_parse_skills(debug_data: dict, lang_db: dict, game_db: dict, hero_stats_db: dict, rules: dict, parsers: dict) -> list:
     print("\n--- Phase 2: Parsing skills from unified data ---")
     processed_heroes_data = []
     
-    parsers['warnings_list'] = []; parsers['unique_warnings_set'] = set()
-    parsers['familiar_debug_log'] = []; parsers['familiar_parameter_log'] = []
+    parsers['familiar_parameter_log'] = []
+    diagnostics = parsers.setdefault('diagnostics', Diagnostics())
+    placeholder_stats = parsers.setdefault('placeholder_stats', PlaceholderStats())
+    set_placeholder_stats(placeholder_stats)
+    level_table = parsers.get('level_table') # Only with --level-tables
+    set_level_table(level_table)
 
-    def collect_warnings(new_warnings):
-        if not new_warnings: return
-        for w in new_warnings:
-            if w not in parsers['unique_warnings_set']:
-                parsers['unique_warnings_set'].add(w); parsers['warnings_list'].append(w)
+    def set_context(parser_name):
+        placeholder_stats.parser = diagnostics.parser = parser_name
 
     for i, (hero_id, full_hero_data) in enumerate(debug_data.items()):
         print(f"\r[{i+1}/{len(debug_data)}] Parsing skills for: {hero_id.ljust(40)}", end="")
+        placeholder_stats.hero_id = diagnostics.hero_id = hero_id
+        if level_table is not None: level_table.hero_id = hero_id
         hero_final_stats = get_hero_final_stats(hero_id, hero_stats_db)
         processed_hero = full_hero_data.copy()
         processed_hero['name'] = hero_final_stats.get('name')
@@ -293,10 +325,12 @@ def phase_two_parse_skills(debug_data: dict, lang_db: dict, game_db: dict, hero_
             
             # --- The Final, Robust Orchestration Logic ---
             
+            set_context("parse_direct_effect")
             skill_descriptions['directEffect'] = parsers['direct_effect'](special_data, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
             
-            parsed_clear_buffs, new_warnings = parsers['clear_buffs'](special_data, lang_db, parsers)
-            skill_descriptions['clear_buffs'] = parsed_clear_buffs; collect_warnings(new_warnings)
+            set_context("parse_clear_buffs")
+            parsed_clear_buffs, new_warnings = parsers['clear_buffs'](special_data, lang_db, rules, parsers)
+            skill_descriptions['clear_buffs'] = parsed_clear_buffs; diagnostics.extend(new_warnings)
 
             all_properties = special_data.get("properties", [])
             standard_properties = []
@@ -304,21 +338,25 @@ def phase_two_parse_skills(debug_data: dict, lang_db: dict, game_db: dict, hero_
             for prop in all_properties:
                 prop_type = prop.get("propertyType")
                 if prop_type == "DifferentExtraHitPowerChainStrike":
+                    set_context("parse_chain_strike")
                     parsed_special, new_warnings = parse_chain_strike(prop, special_data, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
                     skill_descriptions.setdefault('properties', []).extend(parsed_special)
-                    collect_warnings(new_warnings)
+                    diagnostics.extend(new_warnings)
                 else:
                     standard_properties.append(prop)
             
+            set_context("parse_properties")
             parsed_properties, new_warnings = parsers['properties'](standard_properties, special_data, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
-            skill_descriptions.setdefault('properties', []).extend(parsed_properties); collect_warnings(new_warnings)
+            skill_descriptions.setdefault('properties', []).extend(parsed_properties); diagnostics.extend(new_warnings)
 
             # --- MODIFIED: Use setdefault().extend() for ALL skill types ---
+            set_context("parse_status_effects")
             parsed_status_effects, new_warnings = parsers['status_effects'](special_data.get("statusEffects",[]), special_data, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
-            skill_descriptions.setdefault('statusEffects', []).extend(parsed_status_effects); collect_warnings(new_warnings)
+            skill_descriptions.setdefault('statusEffects', []).extend(parsed_status_effects); diagnostics.extend(new_warnings)
             
+            set_context("parse_familiars")
             parsed_familiars, new_warnings = parsers['familiars'](special_data.get("summonedFamiliars",[]), special_data, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
-            skill_descriptions.setdefault('familiars', []).extend(parsed_familiars); collect_warnings(new_warnings)
+            skill_descriptions.setdefault('familiars', []).extend(parsed_familiars); diagnostics.extend(new_warnings)
 
         passive_list = full_hero_data.get('passiveSkills', [])
         costume_passive_list = []
@@ -327,58 +365,226 @@ def phase_two_parse_skills(debug_data: dict, lang_db: dict, game_db: dict, hero_
                  costume_passive_list = costume_bonuses.get('passiveSkills', [])
         all_passives = passive_list + costume_passive_list
         if all_passives:
+            set_context("parse_passive_skills")
             parsed_passives, new_warnings = parsers['passive_skills'](all_passives, hero_final_stats, lang_db, game_db, hero_id, rules, parsers)
-            skill_descriptions['passiveSkills'] = parsed_passives; collect_warnings(new_warnings)
+            skill_descriptions['passiveSkills'] = parsed_passives; diagnostics.extend(new_warnings)
         
         processed_hero['_special_data_context'] = special_data_for_hero
         processed_hero['skillDescriptions'] = {k: v for k, v in skill_descriptions.items() if v}
         processed_heroes_data.append(processed_hero)
     
+    set_placeholder_stats(None); set_level_table(None)
     print("\n--- Phase 2 Complete ---")
     return processed_heroes_data
 
-def analyze_unresolved_placeholders(final_hero_data: list):
-    """Analyzes the final output and prints a summary of unresolved placeholders."""
-    print("\n--- Analyzing unresolved placeholders in final output ---")
-    unresolved_counter = Counter()
-    for hero in final_hero_data:
-        if 'skillDescriptions' not in hero: continue
-        items_to_check = []
-        for skill_data in hero['skillDescriptions'].values():
-            if isinstance(skill_data, list): items_to_check.extend(skill_data)
-            elif isinstance(skill_data, dict): items_to_check.append(skill_data)
-        idx = 0
-        while idx < len(items_to_check):
-            item = items_to_check[idx]; idx += 1
-            if not isinstance(item, dict): continue
-            if 'nested_effects' in item and isinstance(item['nested_effects'], list):
-                items_to_check.extend(item['nested_effects'])
-            for key, text in item.items():
-                if isinstance(text, str) and ('description' in key or 'tooltip' in key or key in ['en', 'ja']):
-                    found = re.findall(r'(\{\w+\})', text)
-                    if found: unresolved_counter.update(found)
-    if not unresolved_counter:
-        print("✅ All placeholders resolved successfully!")
-    else:
-        print(f"{'Placeholder':<30} | {'Count':<10}"); print("-" * 43)
-        for placeholder, count in unresolved_counter.most_common():
-            print(f"{placeholder:<30} | {count:<10}")
-        print("-" * 43); print(f"Total Unique Unresolved Placeholders: {len(unresolved_counter)}")
+# --- Multi-Version Processing ---
+def _hero_fingerprint(hero_data: dict, hero_final_stats: dict) -> str:
+    """Everything Phase 2 reads for one hero besides the shared language DB and rules."""
+    payload = json.dumps([hero_data, hero_final_stats], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def process_versions(version_dirs: list, rules: dict, lang_db: dict, parsers: dict):
+    """
+    Processes several game-data versions in one run. Rules, languages and the parser setup are
+    loaded once by the caller. Each folder holds characters.json/specials.json/battle.json and
+    optionally its own stats CSV (otherwise the latest one in DATA_DIR is used). A hero whose
+    resolved data and stats are identical to the previous version is not parsed again.
+    Outputs go to data/output/versions/<folder name>/, with a comparison file per version step.
+    """
+    print(f"\n=== Multi-version run: {', '.join(d.name for d in version_dirs)} ===")
+    shared_hero_stats_db = None
+    previous = None
+    for version_dir in version_dirs:
+        label = version_dir.name
+        version_output_dir = VERSIONS_OUTPUT_DIR / label
+        version_output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"\n=== Version: {label} ===")
+
+        game_db = load_game_data(version_dir)
+        if has_hero_stats_csv(version_dir, HERO_STATS_CSV_PATTERN):
+            hero_stats_db = load_hero_stats_from_csv(version_dir, HERO_STATS_CSV_PATTERN)
+        else:
+            if shared_hero_stats_db is None: shared_hero_stats_db = load_hero_stats_from_csv(DATA_DIR, HERO_STATS_CSV_PATTERN)
+            hero_stats_db = shared_hero_stats_db
+
+        debug_json_path = version_output_dir / DEBUG_JSON_PATH.name
+        phase_one_integrate_data(game_db, debug_json_path)
+        with open(debug_json_path, 'r', encoding='utf-8') as f:
+            debug_data = json.load(f)
+
+        fingerprints = {hero_id: _hero_fingerprint(hero_data, get_hero_final_stats(hero_id, hero_stats_db))
+                        for hero_id, hero_data in debug_data.items()}
+        reused = {}
+        # Tooltips depend on the version's extra description keys, so nothing is reused if they changed.
+        if previous and previous['extra_description_keys'] == game_db.get('extra_description_keys'):
+            reused = {hero_id: previous['processed'][hero_id] for hero_id, fingerprint in fingerprints.items()
+                      if previous['fingerprints'].get(hero_id) == fingerprint}
+        to_parse = {hero_id: hero_data for hero_id, hero_data in debug_data.items() if hero_id not in reused}
+        if previous: print(f"\n{len(reused)} heroes unchanged since {previous['label']}; parsing {len(to_parse)}.")
+
+        parsed = dict(zip(to_parse, phase_two_parse_skills(to_parse, lang_db, game_db, hero_stats_db, rules, parsers)))
+        final_hero_data = [reused[hero_id] if hero_id in reused else parsed[hero_id] for hero_id in debug_data]
+
+        output_rows = write_final_csv(final_hero_data, version_output_dir / FINAL_CSV_PATH.name)
+        write_debug_csv(final_hero_data, version_output_dir / DEBUG_CSV_PATH.name)
+        if previous:
+            source_changed = [hero_id for hero_id in debug_data if hero_id in previous['fingerprints'] and hero_id not in reused]
+            write_version_comparison(previous['label'], previous['output_rows'], label, output_rows,
+                                     VERSIONS_OUTPUT_DIR / f"comparison_{previous['label']}_to_{label}.json", source_changed)
+
+        # Only the previous version is kept, so memory does not grow with the number of versions.
+        previous = {
+            'label': label, 'fingerprints': fingerprints, 'output_rows': output_rows,
+            'processed': dict(zip(debug_data, final_hero_data)),
+            'extra_description_keys': game_db.get('extra_description_keys'),
+        }
 
-def main():
+# --- Single-Hero Mode ---
+def process_single_heroes(hero_ids: list, game_db: dict, lang_db: dict, hero_stats_db, rules: dict, parsers: dict) -> list:
+    """
+    --hero: resolves only the given heroes (get_full_hero_data follows just their own references,
+    i.e. their master_db closure), parses them, prints the rendered rows and their diagnostics, and
+    writes the resolved data, parsed skills and row of each to single_hero/<hero_id>.json.
+    No other output file is written.
+    """
+    print(f"\n--- Single-hero mode: {', '.join(hero_ids)} ---")
+    heroes_by_id = {hero.get("id"): hero for hero in game_db.get('heroes', [])}
+    for hero_id in hero_ids:
+        if hero_id in heroes_by_id: continue
+        suggestions = difflib.get_close_matches(hero_id, [h for h in heroes_by_id if isinstance(h, str)], n=3)
+        print(f"Warning: Hero '{hero_id}' not found.{' Did you mean: ' + ', '.join(suggestions) + '?' if suggestions else ''}")
+    # The same JSON round trip a full run does by reloading debug_hero_data.json.
+    debug_data = json.loads(json.dumps({
+        hero_id: get_full_hero_data(heroes_by_id[hero_id], game_db) for hero_id in dict.fromkeys(hero_ids) if hero_id in heroes_by_id
+    }, ensure_ascii=False))
+    if not debug_data: return []
+
+    final_hero_data = phase_two_parse_skills(debug_data, lang_db, game_db, hero_stats_db, rules, parsers)
+    output_rows = render_final_rows(final_hero_data)
+    samples = parsers['diagnostics'].samples
+    SINGLE_HERO_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    for hero, row in zip(final_hero_data, output_rows):
+        hero_id = row["hero_id"]
+        warnings = [event for sample_hero_id, event in samples if sample_hero_id == hero_id]
+        print(f"\n=== {hero_id} ({row['hero_name']}) ===")
+        for field, value in row.items():
+            if field not in ("hero_id", "hero_name") and value: print(f"[{field}]\n{value}")
+        for event in warnings: print(f"⚠️ {event.code} {event}")
+        output_path = SINGLE_HERO_OUTPUT_DIR / f"{hero_id}.json"
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "row": row, "skillDescriptions": hero.get('skillDescriptions', {}),
+                    "diagnostics": [{"code": e.code, "parser": e.parser, "block_id": e.block_id, "message": e.message} for e in warnings],
+                    "resolved": debug_data[hero_id],
+                }, f, indent=2, ensure_ascii=False)
+            print(f"Details saved to {SINGLE_HERO_OUTPUT_DIR.name}/{output_path.name}")
+        except Exception as e:
+            print(f"Warning: Could not write details for '{hero_id}'. Error: {e}")
+    return output_rows
+
+def report_unresolved_placeholders(stats: PlaceholderStats, top_n: int = 15):
+    """Prints the unresolved placeholders generate_description recorded during Phase 2."""
+    print("\n--- Unresolved placeholders in rendered descriptions ---")
+    if not stats.placeholders:
+        print("✅ All placeholders resolved successfully!")
+        return
+    print(f"{'Placeholder':<30} | {'Count':<10}"); print("-" * 43)
+    for placeholder, count in stats.placeholders.most_common():
+        print(f"{placeholder:<30} | {count:<10}")
+    print("-" * 43); print(f"Total Unique Unresolved Placeholders: {len(stats.placeholders)}")
+
+    print("\n--- Breakdown by Parser ---")
+    print(f"{'Parser':<30} | {'Count':<10}"); print("-" * 43)
+    for parser_name, count in stats.by_parser.most_common():
+        print(f"{parser_name:<30} | {count:<10}")
+
+    print(f"\n--- Top {top_n} lang_ids ({len(stats.by_lang_id)} affected) ---")
+    for lang_id, count in stats.by_lang_id.most_common(top_n):
+        placeholders = ", ".join(stats.lang_id_placeholders[lang_id])
+        print(f"{count:>6}  {lang_id}  [{placeholders}]")
+
+    print(f"\n--- Top {top_n} heroes ({len(stats.by_hero)} affected) ---")
+    for hero_id, count in stats.by_hero.most_common(top_n):
+        print(f"{count:>6}  {hero_id}")
+
+def report_diagnostics(diagnostics: Diagnostics, diagnostics_path: Path = None):
+    """Prints the per-parser and per-code counts of the Phase 2 diagnostics."""
+    if not diagnostics.total: return
+    print(f"\n--- 🚨 Found {diagnostics.total} diagnostics ({len(diagnostics.by_code)} codes, level >= {diagnostics.level}) ---")
+    print("\n--- Breakdown by Parser ---")
+    print(f"{'Parser':<30} | {'Count':<10}"); print("-" * 43)
+    for source, count in diagnostics.by_parser.most_common():
+        print(f"{source:<30} | {count:<10}")
+    print("\n--- Breakdown by Code ---")
+    print(f"{'Code':<30} | {'Count':<10}"); print("-" * 43)
+    for code, count in diagnostics.by_code.most_common():
+        print(f"{code:<30} | {count:<10}")
+    print("-" * 43)
+    if diagnostics_path: print(f"{diagnostics.written} sampled events saved to {diagnostics_path.name}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hero Skill Data Processor")
+    parser.add_argument(
+        "--sqlite", nargs="?", const=SQLITE_DB_PATH, type=Path, metavar="PATH",
+        help=f"Also write heroes, stats, skill blocks, parsed skills and language keys to a SQLite database (default: {SQLITE_DB_PATH.name})."
+    )
+    parser.add_argument(
+        "--json-shards", nargs="?", const=64, type=int, metavar="N",
+        help=f"Also write the rendered rows as content-hashed JSON files plus a manifest to {JSON_SHARDS_DIR.name}/: "
+             "N hash-partitioned shards (default: 64), or one file per hero with 0."
+    )
+    parser.add_argument(
+        "--hero", action="append", metavar="ID",
+        help=f"Resolve, parse and print only this hero (repeatable), writing its details to {SINGLE_HERO_OUTPUT_DIR.name}/. "
+             "No other output file is written."
+    )
+    parser.add_argument(
+        "--versions", nargs="+", type=Path, metavar="DIR",
+        help="Process several game-data folders (oldest first) in one run and compare them. "
+             "Writes to data/output/versions/ only; --sqlite, --json-shards and the run-to-run delta are skipped."
+    )
+    parser.add_argument(
+        "--diagnostics-level", choices=list(LEVELS), default="warning",
+        help="Lowest diagnostics level to count and log; 'debug' adds the familiar lang_id candidates (default: warning)."
+    )
+    parser.add_argument(
+        "--diagnostics-sample", type=int, default=20, metavar="N",
+        help=f"Log and keep the first N events of each code (default: 20). Written to {DIAGNOSTICS_PATH.name}."
+    )
+    parser.add_argument(
+        "--diagnostics-every", type=int, default=100, metavar="K",
+        help="After the first N, log every K-th event of each code; 0 logs none (default: 100)."
+    )
+    parser.add_argument(
+        "--memprofile", action="store_true",
+        help=f"Trace memory per phase (held/peak traced memory, RSS, top allocation sites, object counts) and save it to {MEMPROFILE_PATH.name}. Slows the run down."
+    )
+    parser.add_argument(
+        "--level-tables", action="store_true",
+        help=f"Also compute every resolved value for levels 1..maxLevel and save them to {LEVEL_TABLES_PATH.name}. Ignored with --versions and --hero."
+    )
+    args = parser.parse_args(argv)
+    if args.hero and args.versions: parser.error("--hero cannot be combined with --versions")
+    return args
+
+def main(argv=None):
     """Main function to run the entire process."""
+    args = parse_args(argv)
+    diagnostics = None
+    profiler = MemoryProfiler(enabled=args.memprofile)
     try:
-        rules = load_rules_from_csvs(LOADER_SCRIPT_DIR)
-        language_db = load_languages()
-        game_db = load_game_data()
-        hero_stats_db = load_hero_stats_from_csv(DATA_DIR, HERO_STATS_CSV_PATTERN)
-
-        phase_one_integrate_data(game_db, DEBUG_JSON_PATH)
-
-        print("\nReloading unified data from file to ensure consistency...")
-        with open(DEBUG_JSON_PATH, 'r', encoding='utf-8') as f:
-            debug_data_from_file = json.load(f)
-
+        # Game data and stats are only needed here for a single-version run. The parsers only read
+        # their own language namespaces; the SQLite export (not used with --hero) stores the whole language DB.
+        lang_allowlist = None if args.sqlite and not args.hero else LangKeyAllowlist(PARSER_LANG_PREFIXES, PARSER_LANG_SUBSTRINGS)
+        sources = load_all_sources(LOADER_SCRIPT_DIR, DATA_DIR, include_game_data=not args.versions, lang_allowlist=lang_allowlist)
+        rules, language_db = sources["rules"], sources["languages"]
+        # The sources load concurrently, so each one's share is measured from what it returned.
+        profiler.checkpoint("load_sources", sources)
+        # In single-hero mode the full run's diagnostics log is left alone, and every event is kept
+        # so each hero's report is complete.
+        if args.hero: diagnostics = Diagnostics(None, args.diagnostics_level, sample_first=None)
+        else: diagnostics = Diagnostics(DIAGNOSTICS_PATH, args.diagnostics_level, args.diagnostics_sample, args.diagnostics_every)
         parsers = {
             'direct_effect': parse_direct_effect, 
             'clear_buffs': parse_clear_buffs,
@@ -387,13 +593,54 @@ def main():
             'familiars': parse_familiars, 
             'passive_skills': parse_passive_skills,
             'prop_lang_subset': [key for key in language_db if key.startswith("specials.v2.property.")],
-            'extra_lang_ids': [key for key in language_db if '.extra' in key]
+            'extra_lang_ids': [key for key in language_db if '.extra' in key],
+            'lang_key_tokens': build_lang_key_tokens(language_db),
+            'diagnostics': diagnostics,
+            'level_table': LevelTable() if args.level_tables and not (args.versions or args.hero) else None
         }
+        profiler.checkpoint("build_parsers")
+
+        if args.versions:
+            process_versions(args.versions, rules, language_db, parsers)
+            profiler.checkpoint("process_versions")
+            diagnostics.close()
+            report_diagnostics(diagnostics, DIAGNOSTICS_PATH)
+            report_unresolved_placeholders(parsers['placeholder_stats'])
+            print(f"\n✅ Multi-version process complete. All files saved.")
+            return
+
+        game_db, hero_stats_db = sources["game_data"], sources["hero_stats"]
+
+        if args.hero:
+            process_single_heroes(args.hero, game_db, language_db, hero_stats_db, rules, parsers)
+            profiler.checkpoint("single_hero")
+            print(f"\n✅ Single-hero process complete.")
+            return
+
+        usage = phase_one_integrate_data(game_db, DEBUG_JSON_PATH)
+        profiler.checkpoint("phase_one")
+
+        print("\nReloading unified data from file to ensure consistency...")
+        with open(DEBUG_JSON_PATH, 'r', encoding='utf-8') as f:
+            debug_data_from_file = json.load(f)
+        profiler.checkpoint("reload_debug_json")
         
         final_hero_data = phase_two_parse_skills(debug_data_from_file, language_db, game_db, hero_stats_db, rules, parsers)
+        diagnostics.close()
+        profiler.checkpoint("phase_two")
+        if parsers['level_table'] is not None: write_level_tables(parsers['level_table'], LEVEL_TABLES_PATH); profiler.checkpoint("write_level_tables")
         
-        write_final_csv(final_hero_data, FINAL_CSV_PATH)
+        output_rows = write_final_csv(final_hero_data, FINAL_CSV_PATH)
+        profiler.checkpoint("write_final_csv")
+        write_output_delta(output_rows, OUTPUT_HASHES_PATH, OUTPUT_DELTA_PATH)
+        profiler.checkpoint("write_output_delta")
+        if args.json_shards is not None: write_json_shards(output_rows, JSON_SHARDS_DIR, args.json_shards); profiler.checkpoint("write_json_shards")
         write_debug_csv(final_hero_data, DEBUG_CSV_PATH)
+        profiler.checkpoint("write_debug_csv")
+        if args.sqlite:
+            write_sqlite_db(args.sqlite, debug_data_from_file, final_hero_data, language_db, hero_stats_db, diagnostics,
+                            usage.to_json(game_db)["entities"])
+            profiler.checkpoint("write_sqlite_db")
         
         param_log = parsers.get('familiar_parameter_log', [])
         if param_log:
@@ -405,37 +652,27 @@ def main():
             except Exception as e:
                 print(f"Warning: Could not write familiar parameter log. Error: {e}")
         
-        # --- MODIFIED: The new, detailed warning report system ---
-        warnings_list = parsers.get('warnings_list', [])
-        if warnings_list:
-            unique_warnings = parsers.get('unique_warnings_set', set())
-            print(f"\n--- 🚨 Found {len(warnings_list)} warnings ({len(unique_warnings)} unique types) ---")
-            
-            warning_counts = Counter()
-            for w in warnings_list:
-                source = "unknown"
-                if w.startswith("["):
-                    # Extracts 'parser_name' from "[parser_name]: message"
-                    source = w.split("]")[0][1:] 
-                warning_counts[source] += 1
-            
-            print("\n--- Breakdown by Parser ---")
-            print(f"{'Parser':<30} | {'Count':<10}")
-            print("-" * 43)
-            for source, count in warning_counts.most_common():
-                print(f"{source:<30} | {count:<10}")
-            print("-" * 43)
-
-        analyze_unresolved_placeholders(final_hero_data)
+        report_diagnostics(diagnostics, DIAGNOSTICS_PATH)
+        report_unresolved_placeholders(parsers['placeholder_stats'])
         
         print(f"\n✅ Process complete. All files saved.")
 
     except Exception as e:
         print(f"\n[FATAL ERROR]: {type(e).__name__} - {e}")
         traceback.print_exc()
+    finally:
+        if diagnostics: diagnostics.close()
+        profiler.report(MEMPROFILE_PATH)
 
 if __name__ == "__main__":
     main()\
     
 # D:\HeroDB_Project\packages\parser_engineにいる状態で
-# python hero_main.py
\ No newline at end of file
+# python hero_main.py
+# python hero_main.py --sqlite   (hero_data.sqlite も出力する。--sqlite <パス> で出力先を指定)
+# python hero_main.py --diagnostics-level debug   (familiarのlang_id候補も hero_diagnostics.jsonl に記録する)
+# python hero_main.py --versions ..\..\data\versions\V7700 ..\..\data\versions\V7803   (複数バージョンを1回で処理し、versions\ 以下にバージョン別の出力と比較結果を出す)
+# python hero_main.py --level-tables   (解決した全ての値をレベル1..maxLevelで計算し hero_level_values.json に出力する)
+# python hero_main.py --json-shards   (ヒーロー行を内容ハッシュ付きファイル名のJSONシャードと manifest.json で heroes_json\ に出力する。0 でヒーローごとに1ファイル)
+# python hero_main.py --memprofile   (フェーズごとのメモリ使用量・ピーク・RSS・主な確保箇所・オブジェクト数を hero_memprofile.json に出力する)
+# python hero_main.py --hero ninja_osamu --hero royal_knight_costume_blacksmith   (指定ヒーローだけを解決・解析して表示し、single_hero\ に詳細を出力する)
\ No newline at end of file
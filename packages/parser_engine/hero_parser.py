@@ -3,7 +3,73 @@
 import json
 import re
 import math
-import pandas as pd
+import sys
+from collections import Counter
+from diagnostics import DiagnosticEvent
+from exception_rules import get_rule_table
+
+# --- Unresolved Placeholder Tracking ---
+# generate_description reports the placeholders its output still contains to the active
+# PlaceholderStats, so the statistics are collected while rendering instead of re-scanning
+# the finished output. phase_two_parse_skills sets hero_id/parser before each parser call.
+PLACEHOLDER_PATTERN = re.compile(r'\{\w+\}')
+
+class PlaceholderStats:
+    def __init__(self):
+        self.hero_id = None; self.parser = None
+        self.placeholders = Counter()
+        self.by_lang_id = Counter(); self.by_hero = Counter(); self.by_parser = Counter()
+        self.lang_id_placeholders = {} # lang_id -> Counter of its unresolved placeholders
+
+    def record(self, lang_id: str, text: str):
+        found = PLACEHOLDER_PATTERN.findall(text)
+        if not found: return
+        self.placeholders.update(found)
+        self.by_lang_id[lang_id] += len(found)
+        self.by_hero[self.hero_id or "unknown"] += len(found)
+        self.by_parser[self.parser or "unknown"] += len(found)
+        self.lang_id_placeholders.setdefault(lang_id, Counter()).update(found)
+
+_placeholder_stats = None
+
+def set_placeholder_stats(stats):
+    """Makes stats (or None) the collector generate_description reports to."""
+    global _placeholder_stats
+    _placeholder_stats = stats
+
+# --- Language Key Namespaces ---
+# Every lang_id the parsers build or search starts with one of these prefixes or is a tooltip
+# ('.extra') key, so hero_main.py only loads these keys (see LangKeyAllowlist).
+PARSER_LANG_PREFIXES = ("specials.v2.", "familiar.", "herocard.passive_skill.")
+PARSER_LANG_SUBSTRINGS = (".extra",)
+
+def build_lang_key_tokens(lang_keys) -> dict:
+    """
+    {lang_key: frozenset of its lowercased '.'-separated parts}, built once per run and passed to
+    the scorers as parsers['lang_key_tokens']. The parts are interned, so the sets share them.
+    """
+    return {key: frozenset(sys.intern(part) for part in key.lower().split('.')) for key in lang_keys}
+
+def lang_key_tokens(lang_key: str, key_tokens: dict) -> frozenset:
+    tokens = key_tokens.get(lang_key)
+    return tokens if tokens is not None else frozenset(lang_key.lower().split('.'))
+
+# --- Per-Level Value Tables ---
+# With hero_main.py --level-tables, the parsers report each value's progression to the active
+# LevelTable (see level_tables.py) alongside the maxLevel value they compute. Both helpers
+# are no-ops otherwise.
+_level_table = None
+
+def set_level_table(table):
+    """Makes table (or None) the LevelTable the parsers report to."""
+    global _level_table
+    _level_table = table
+
+def record_level_term(block_id, placeholder: str, base, inc, max_level: int, op: str = "none", divisor=1, offset=0):
+    if _level_table is not None: _level_table.record(block_id, placeholder, base, inc, max_level, op, divisor, offset)
+
+def scale_last_level_term_by_attack(placeholder: str, attack, multiplier=1):
+    if _level_table is not None: _level_table.scale_last_by_attack(placeholder, attack, multiplier)
 
 # --- Helper Functions (used by all parsers) ---
 
@@ -29,6 +95,9 @@ def generate_description(lang_id: str, lang_params: dict, lang_db: dict) -> dict
     for key, value in lang_params.items():
         desc_en = desc_en.replace(f"{{{key}}}", str(value))
         desc_ja = desc_ja.replace(f"{{{key}}}", str(value))
+    if _placeholder_stats is not None:
+        if "{" in desc_en: _placeholder_stats.record(lang_id, desc_en)
+        if "{" in desc_ja: _placeholder_stats.record(lang_id, desc_ja)
     return {"en": desc_en, "ja": desc_ja}
 
 def format_value(value):
@@ -74,71 +143,68 @@ def _find_and_parse_extra_description(
     return {}
 
 # --- Core Data Integration Logic ---
-def get_full_hero_data(base_data: dict, game_db: dict) -> dict:
+def get_full_hero_data(base_data: dict, game_db: dict, usage=None) -> dict:
+    """usage, if given, is a UsageIndex that records every master_db id the hero references."""
     resolved_data = json.loads(json.dumps(base_data))
     processed_ids = set()
-    _resolve_recursive(resolved_data, game_db['master_db'], processed_ids)
+    _resolve_recursive(resolved_data, game_db['master_db'], processed_ids, usage)
     return resolved_data
 
-def _resolve_recursive(current_data, master_db, processed_ids):
+def _resolve_recursive(current_data, master_db, processed_ids, usage=None, path=""):
     if id(current_data) in processed_ids: return
     processed_ids.add(id(current_data))
     ID_KEYS_FOR_LISTS = ['properties','statusEffects','statusEffectsPerHit','summonedFamiliars','effects','passiveSkills','costumeBonusPassiveSkillIds','statusEffectsToAdd','statusEffectCollections']
     if isinstance(current_data, dict):
         for key, value in list(current_data.items()):
+            key_path = f"{path}.{key}" if path else key
             if key.lower().endswith('id') and isinstance(value, str):
+                # An entity's own 'id' is not a reference; the path that led to it was recorded already.
+                if usage is not None and key != 'id' and value in master_db: usage.record(value, key_path)
                 if value in master_db and value not in processed_ids:
                     processed_ids.add(value)
                     new_data = json.loads(json.dumps(master_db[value]))
-                    _resolve_recursive(new_data, master_db, processed_ids)
+                    _resolve_recursive(new_data, master_db, processed_ids, usage, f"{key_path}_details")
                     current_data[f"{key}_details"] = new_data
             elif key in ID_KEYS_FOR_LISTS and isinstance(value, list):
-                _resolve_recursive(value, master_db, processed_ids)
+                _resolve_recursive(value, master_db, processed_ids, usage, key_path)
             elif isinstance(value, (dict, list)):
-                _resolve_recursive(value, master_db, processed_ids)
+                _resolve_recursive(value, master_db, processed_ids, usage, key_path)
     elif isinstance(current_data, list):
         for i, item in enumerate(current_data):
+            item_path = f"{path}.{i}"
             item_id_to_resolve = item if isinstance(item, str) else (item.get('id') if isinstance(item, dict) else None)
+            if usage is not None and item_id_to_resolve in master_db: usage.record(item_id_to_resolve, item_path)
             if item_id_to_resolve and item_id_to_resolve in master_db and item_id_to_resolve not in processed_ids:
                 processed_ids.add(item_id_to_resolve)
                 new_data = json.loads(json.dumps(master_db[item_id_to_resolve]))
-                _resolve_recursive(new_data, master_db, processed_ids)
+                _resolve_recursive(new_data, master_db, processed_ids, usage, item_path)
                 if isinstance(current_data[i], str): current_data[i] = new_data
                 else: current_data[i].update(new_data)
             elif isinstance(item, (dict, list)):
-                 _resolve_recursive(item, master_db, processed_ids)
+                 _resolve_recursive(item, master_db, processed_ids, usage, item_path)
 
 # --- Core Analysis Tools ---
-def get_hero_final_stats(hero_id: str, hero_stats_db: dict) -> dict:
-    hero_data = hero_stats_db.get(hero_id)
-    if not hero_data: return {"max_attack": 0, "name": "N/A"}
-    attack_col = 'Max level: Attack'
-    for i in range(4, 0, -1):
-        col_name = f'Max level CB{i}: Attack'
-        if col_name in hero_data and pd.notna(hero_data[col_name]):
-            attack_col = col_name; break
-    return {"max_attack": int(hero_data.get(attack_col, 0)), "name": hero_data.get('Name', 'N/A')}
+def get_hero_final_stats(hero_id: str, hero_stats_db) -> dict:
+    """Max-level stats of the highest costume bonus (precomputed for all heroes by HeroStatsTable)."""
+    return hero_stats_db.final_stats(hero_id)
 
 def find_and_calculate_value(p_holder: str, data_block: dict, max_level: int, hero_id: str, rules: dict, is_modifier: bool = False, ignore_keywords: list = None) -> (any, str):
-    p_holder_upper = p_holder.upper()
-    rule = rules.get("hero_rules", {}).get("specific", {}).get(hero_id, {}).get(p_holder_upper)
-    if not rule: rule = rules.get("hero_rules", {}).get("common", {}).get(p_holder_upper)
+    block_id = data_block.get("id") if isinstance(data_block, dict) else None
+    rule = get_rule_table(rules).lookup(hero_id, p_holder.upper())
     if rule:
-        if rule.get("calc") == "fixed":
-            value_str = rule.get("value")
-            try: return int(value_str), "Fixed Rule"
-            except (ValueError, TypeError):
-                try: return float(value_str), "Fixed Rule"
-                except (ValueError, TypeError): return value_str, "Fixed Rule"
-        if key_to_find := rule.get("key"):
-            flat_data = flatten_json(data_block)
-            matching_keys = [k for k in flat_data if k.endswith(key_to_find)]
-            if len(matching_keys) == 1:
-                found_key = matching_keys[0]; value = flat_data[found_key]
-                if isinstance(value, (int, float)):
-                    if 'permil' in found_key.lower(): return value / 10, f"Exception Rule: {found_key}"
-                    return int(value), f"Exception Rule: {found_key}"
-        return None, f"Exception rule key '{key_to_find}' not found or ambiguous"
+        if rule.calc == "fixed":
+            if isinstance(rule.value, (int, float)): record_level_term(block_id, p_holder, rule.value, 0, max_level)
+            return rule.value, "Fixed Rule"
+        flat_data = flatten_json(data_block)
+        if found_key := rule.find_key(flat_data):
+            value = flat_data[found_key]
+            if isinstance(value, (int, float)):
+                if 'permil' in found_key.lower():
+                    record_level_term(block_id, p_holder, value, 0, max_level, divisor=10)
+                    return value / 10, f"Exception Rule: {found_key}"
+                record_level_term(block_id, p_holder, value, 0, max_level, op="trunc")
+                return int(value), f"Exception Rule: {found_key}"
+        return None, f"Exception rule key '{rule.key}' not found or ambiguous"
     if not isinstance(data_block, dict): return None, None
     flat_data = flatten_json(data_block)
     if ignore_keywords:
@@ -173,8 +239,12 @@ def find_and_calculate_value(p_holder: str, data_block: dict, max_level: int, he
     if not isinstance(inc_val, (int, float)): inc_val = 0
     calculated_val = base_val + inc_val * (max_level - 1)
     if is_modifier or 'modifier' in found_key.lower():
+        record_level_term(block_id, p_holder, base_val, inc_val, max_level, divisor=10, offset=1000)
         return ((base_val - 1000) + (inc_val * (max_level - 1))) / 10, found_key
-    if 'permil' in found_key.lower(): return calculated_val / 10, found_key
+    if 'permil' in found_key.lower():
+        record_level_term(block_id, p_holder, base_val, inc_val, max_level, divisor=10)
+        return calculated_val / 10, found_key
+    record_level_term(block_id, p_holder, base_val, inc_val, max_level, op="trunc")
     return int(calculated_val), found_key
 
 def _collect_keywords_recursively(data_block, depth=0, max_depth=3) -> list:
@@ -209,25 +279,33 @@ def find_best_lang_id(data_block: dict, lang_key_subset: list, parsers: dict, pa
     seen_keywords = {}
     for kw, depth in all_keywords_with_depth:
         if kw not in seen_keywords or depth < seen_keywords[kw]: seen_keywords[kw] = depth
+    # Everything that does not depend on the candidate key is worked out once.
+    keyword_weights = {kw: 100 / (2 ** depth) for kw, depth in seen_keywords.items()}
+    familiar_type = data_block.get("familiarType", "").lower()
+    familiar_side = "allies" if "minion" in familiar_type else None
+    parasite_side = "enemies" if "parasite" in familiar_type else None
+    fixed_power = 'hasfixedpower' in seen_keywords
+    has_negative = any(isinstance(v, (int, float)) and v < 0 for v in data_block.values())
+    key_tokens = parsers.get('lang_key_tokens') or {}
     potential_matches = []
     for lang_key in lang_key_subset:
-        score = 0; lang_key_parts = lang_key.lower().split('.')
-        for kw, depth in seen_keywords.items():
-            if kw in lang_key_parts: score += 100 / (2 ** depth)
-        familiar_type = data_block.get("familiarType", "").lower()
-        if familiar_type:
-            if ("minion" in familiar_type and "allies" in lang_key_parts): score += 20
-            if ("parasite" in familiar_type and "enemies" in lang_key_parts): score += 20
-        if 'fixedpower' in lang_key_parts and 'hasfixedpower' in seen_keywords: score += 3
-        if 'decrement' in lang_key_parts and any(isinstance(v, (int, float)) and v < 0 for v in data_block.values()): score += 2
+        lang_key_parts = lang_key_tokens(lang_key, key_tokens)
+        score = 0
+        for kw in lang_key_parts & keyword_weights.keys(): score += keyword_weights[kw]
+        if familiar_side and familiar_side in lang_key_parts: score += 20
+        if parasite_side and parasite_side in lang_key_parts: score += 20
+        if fixed_power and 'fixedpower' in lang_key_parts: score += 3
+        if has_negative and 'decrement' in lang_key_parts: score += 2
         if score > 0: potential_matches.append({'key': lang_key, 'score': score, 'parts': lang_key_parts})
     if not potential_matches:
         primary_keyword = (data_block.get('propertyType') or data_block.get('statusEffect') or data_block.get('familiarType') or 'N/A')
         return None, f"Could not find lang_id for skill '{data_block.get('id', 'UNKNOWN')}' (type: {primary_keyword})"
     potential_matches.sort(key=lambda x: (-x['score'], len(x['key'])))
-    if "familiar_debug_log" in parsers and data_block.get('familiarType'):
-        log_entry = {"familiar_id":data_block.get('id'),"familiar_instance":data_block,"top_candidates":[{'score':f"{m['score']:.2f}",'key':m['key']} for m in potential_matches[:5]]}
-        parsers["familiar_debug_log"].append(log_entry)
+    diagnostics = parsers.get("diagnostics")
+    if diagnostics and data_block.get('familiarType') and diagnostics.enabled_for("debug"):
+        candidates = [{'score':f"{m['score']:.2f}",'key':m['key']} for m in potential_matches[:5]]
+        diagnostics.emit(DiagnosticEvent("find_best_lang_id", "FAMILIAR_LANG_CANDIDATES", f"Picked '{potential_matches[0]['key']}'",
+                                         data_block.get('id'), level="debug", data={"top_candidates": candidates}))
     return potential_matches[0]['key'], None
 
 # --- Main Skill Parsers ---
@@ -259,7 +337,10 @@ def parse_direct_effect(special_data, hero_stats, lang_db, game_db, hero_id: str
     if base > 0 or inc > 0:
         final_val = round(total_per_mil) if effect_data.get("hasFixedPower") else (round(total_per_mil/100) if effect_type_str=="AddMana" else round(total_per_mil/10))
         params[placeholder] = final_val
+        divisor = 1 if effect_data.get("hasFixedPower") else (100 if effect_type_str=="AddMana" else 10)
+        record_level_term(special_data.get("id"), placeholder, base, inc, max_level, op="round", divisor=divisor)
     elif base < 0 or inc < 0:
         params[placeholder] = abs(round(total_per_mil / 100))
+        record_level_term(special_data.get("id"), placeholder, base, inc, max_level, op="abs_round", divisor=100)
     desc = generate_description(lang_id, params, lang_db)
     return {"lang_id": lang_id, "params": json.dumps(params), **desc}
\ No newline at end of file
@@ -0,0 +1,92 @@
+# hero_stats.py
+# Columnar hero stats table, built from the private heroes CSV by load_hero_stats_from_csv.
+#
+# Only ID, Name and the "<Max level|Limit Break> [CBn] [#n]: <Stat>" columns are read. They are
+# stored as one float array values[hero, costume, tier, stat] (NaN where the CSV has no value),
+# and the final stats of every tier (the highest costume bonus that has an attack value, else the
+# base hero, as the parsers have always used) are computed for all heroes at once when loading.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+STAT_COLUMN_RE = re.compile(r'^(Max level|Limit Break)(?: (CB\d))?(?: #(\d))?: (Attack|Defense|Health|Power)$')
+STATS = ("attack", "defense", "health", "power")
+ATTACK = STATS.index("attack")
+
+def _costume_order(costume: str) -> int:
+    return 0 if costume == "base" else int(costume[2:])
+
+class HeroStatsTable:
+    """
+    costumes: "base", "CB1", ... (ascending). tiers: "max", "lb1", "lb2", ... (CSV order).
+    final[hero, tier, stat] holds the stats the parsers use for that tier.
+    """
+    def __init__(self, ids: list, names: list, costumes: list, tiers: list, values: np.ndarray):
+        self.ids = ids; self.names = names
+        self.index = {hero_id: row for row, hero_id in enumerate(ids)}
+        self.costumes = costumes; self.tiers = tiers
+        self.values = values
+        # Highest costume per hero and tier that has an attack value; heroes without any use the base.
+        has_attack = ~np.isnan(values[:, :, :, ATTACK])
+        highest = len(costumes) - 1 - np.argmax(has_attack[:, ::-1, :], axis=1)
+        self.final_costume = np.where(has_attack.any(axis=1), highest, 0)
+        self.final = np.take_along_axis(values, self.final_costume[:, None, :, None], axis=1)[:, 0]
+
+    @classmethod
+    def from_dataframe(cls, df) -> "HeroStatsTable":
+        columns = [] # (column, costume, tier, stat)
+        for column in df.columns:
+            if m := STAT_COLUMN_RE.match(str(column)):
+                level_kind, costume, limit_break, stat = m.groups()
+                columns.append((column, costume or "base", "max" if level_kind == "Max level" else f"lb{limit_break}", stat.lower()))
+        costumes = sorted({c[1] for c in columns}, key=_costume_order) or ["base"]
+        tiers = list(dict.fromkeys(c[2] for c in columns)) or ["max"]
+        values = np.full((len(df), len(costumes), len(tiers), len(STATS)), np.nan)
+        for column, costume, tier, stat in columns:
+            values[:, costumes.index(costume), tiers.index(tier), STATS.index(stat)] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+        names = df["Name"].tolist() if "Name" in df.columns else ["N/A"] * len(df)
+        return cls(df["ID"].tolist(), names, costumes, tiers, values)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, hero_id):
+        return hero_id in self.index
+
+    def name(self, hero_id: str):
+        row = self.index.get(hero_id)
+        return self.names[row] if row is not None else None
+
+    def tier_stats(self, hero_id: str, tier: str = "max", costume: str = None) -> dict:
+        """{stat: value or None} for one tier; costume None means the final (highest) costume."""
+        row = self.index.get(hero_id)
+        if row is None or tier not in self.tiers: return None
+        t = self.tiers.index(tier)
+        if costume is None: values = self.final[row, t]
+        elif costume in self.costumes: values = self.values[row, self.costumes.index(costume), t]
+        else: return None
+        return {stat: None if np.isnan(v) else float(v) for stat, v in zip(STATS, values)}
+
+    def final_stats(self, hero_id: str) -> dict:
+        """The stats get_hero_final_stats hands to the parsers: the final max-level tier."""
+        row = self.index.get(hero_id)
+        if row is None: return {"max_attack": 0, "name": "N/A"}
+        attack, defense, health, _ = np.nan_to_num(self.final[row, self.tiers.index("max") if "max" in self.tiers else 0])
+        return {"max_attack": int(attack), "max_defense": int(defense), "max_health": int(health), "name": self.names[row]}
+
+    def max_attack(self, hero_id: str):
+        """The final max-level attack, or None for heroes without stats."""
+        stats = self.tier_stats(hero_id)
+        return int(stats["attack"]) if stats and stats["attack"] is not None else None
+
+    def stat_rows(self, hero_id: str):
+        """(hero_id, costume, tier, attack, defense, health, power) for every tier with at least one value."""
+        row = self.index.get(hero_id)
+        if row is None: return
+        for c, costume in enumerate(self.costumes):
+            for t, tier in enumerate(self.tiers):
+                values = self.values[row, c, t]
+                if np.isnan(values).all(): continue
+                yield (hero_id, costume, tier, *(None if np.isnan(v) else float(v) for v in values))
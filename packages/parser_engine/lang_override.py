@@ -1,10 +1,34 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext
+import argparse
 import csv
-import json
+import os
+import queue
+import sys
+import threading
 from pathlib import Path
 import traceback
-import re
+
+# The updater can run without a display (--headless), so Tk is only required for the GUI.
+try:
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, messagebox
+except ImportError:
+    tk = ttk = scrolledtext = messagebox = None
+
+# Deployment: this script is copied to D:\RED\LangOverride and started from the shortcut with
+# pythonw.exe. It needs override_json.py (from packages/parser_engine) copied next to it.
+try:
+    from override_json import LANGUAGES, OverrideParseError, iter_override_entries
+except ImportError as e:
+    # pythonw.exe has no console, so the error is also shown in a dialog.
+    message = f"override_json.py was not found next to {Path(__file__).name} ({Path(__file__).parent}).\nCopy it from packages/parser_engine.\n\n{e}"
+    if messagebox is not None:
+        try:
+            root = tk.Tk(); root.withdraw()
+            messagebox.showerror("Language Override Updater", message)
+            root.destroy()
+        except tk.TclError:
+            pass
+    sys.exit(message)
 
 # --- Configuration ---
 # The script is in D:\RED\LangOverride, and the data files are in D:\RED.
@@ -17,13 +41,123 @@ CSV_JA_PATH = DATA_DIR / "Japanese.csv"
 JSON_OVERRIDE_PATH = DATA_DIR / "languageOverrides.json"
 
 
+def print_progress(level, message):
+    """Default progress callback for headless runs."""
+    print(message, file=sys.stderr if level == "ERROR" else sys.stdout)
+
+
+# --- Core Update Logic (no GUI) ---
+def read_csv_to_dict(file_path):
+    """Reads a 2-column CSV file into a dictionary, using UPPERCASE keys."""
+    data_dict = {}
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        try:
+            # Read the header to know the column names
+            header = [h.upper() for h in next(reader)]
+        except StopIteration:
+            return {} # Return empty dict for empty file
+
+        # Find the index of KEY and TEXT columns
+        try:
+            key_index = header.index('KEY')
+            text_index = header.index('TEXT')
+        except ValueError:
+            raise ValueError(f"CSV file {file_path.name} must have 'KEY' and 'TEXT' columns.")
+
+        for row in reader:
+            if len(row) > max(key_index, text_index):
+                data_dict[row[key_index]] = row[text_index]
+    return data_dict
+
+
+def read_override_entries(json_path, progress=print_progress):
+    """Reads the override JSON, returning {"English": [...], "Japanese": [...]} entry lists."""
+    entries = {language: [] for language in LANGUAGES}
+    try:
+        for language, entry in iter_override_entries(json_path, warn=lambda message: progress("WARN", message)):
+            entries[language].append(entry)
+    except OverrideParseError as e:
+        progress("ERROR", f"Failed to parse JSON: {e}")
+        raise # Stop the process
+    return entries
+
+
+def compute_changes(data_dict, override_list):
+    """
+    Returns {key: new_text} for the override entries that actually change data_dict
+    (new keys or different text). Later entries for the same key win, as before.
+    """
+    final_texts = {}
+    for entry in override_list:
+        final_texts[entry["key"]] = entry["text"]
+    return {key: text for key, text in final_texts.items() if data_dict.get(key) != text}
+
+
+def write_dict_to_csv(file_path, data_dict):
+    """Writes a dictionary back to a 2-column CSV file via a temporary file and an atomic rename."""
+    temp_path = file_path.with_name(file_path.name + ".tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["KEY", "TEXT"]) # Write header
+            for key, value in data_dict.items():
+                writer.writerow([key, value])
+        os.replace(temp_path, file_path)
+    finally:
+        if temp_path.exists(): temp_path.unlink()
+
+
+def update_language_files(progress=print_progress, dry_run=False,
+                          csv_paths=None, override_path=JSON_OVERRIDE_PATH):
+    """
+    Applies languageOverrides.json to the language CSVs. Only files with at least one key
+    whose text changes are rewritten. Returns {language: sorted list of changed keys}.
+    progress(level, message) is called with INFO/SUCCESS/WARN/ERROR messages.
+    """
+    csv_paths = csv_paths or {"English": CSV_EN_PATH, "Japanese": CSV_JA_PATH}
+    progress("INFO", "--- Starting update process ---")
+
+    progress("INFO", f"Reading {override_path.name}...")
+    override_entries = read_override_entries(override_path, progress)
+    progress("INFO", f" -> {sum(len(e) for e in override_entries.values())} override entries parsed successfully.")
+
+    changed_keys = {}
+    for language, csv_path in csv_paths.items():
+        progress("INFO", f"Reading {csv_path.name}...")
+        data_dict = read_csv_to_dict(csv_path)
+        progress("INFO", f" -> Found {len(data_dict)} entries.")
+
+        changes = compute_changes(data_dict, override_entries.get(language, []))
+        changed_keys[language] = sorted(changes)
+        if not changes:
+            progress("INFO", f" -> No {language} text changes. {csv_path.name} left untouched.")
+            continue
+        added = sum(1 for key in changes if key not in data_dict)
+        progress("INFO", f" -> {len(changes)} {language} entries change ({added} new).")
+        if dry_run: continue
+
+        data_dict.update(changes)
+        progress("INFO", f"Writing updated data to {csv_path.name}...")
+        write_dict_to_csv(csv_path, data_dict)
+        progress("INFO", f" -> {language} file saved.")
+
+    progress("SUCCESS", "\n--- Update process completed successfully! ---")
+    return changed_keys
+
+
+# --- GUI ---
 class LanguageToolApp:
+    POLL_INTERVAL_MS = 100
+
     def __init__(self, root):
         """Initializes the GUI application."""
         self.root = root
         self.root.title("Language File Updater")
         self.root.geometry("600x450") # Slightly taller for better log view
         self.root.resizable(False, True)
+        self.messages = queue.Queue()
+        self.worker = None
 
         # Create and place widgets
         self.main_frame = ttk.Frame(root, padding="10")
@@ -38,146 +172,70 @@ class LanguageToolApp:
             self.main_frame, wrap=tk.WORD, state="disabled", height=20
         )
         self.log_area.pack(pady=5, fill=tk.BOTH, expand=True)
-        
+
         # Configure text tags for colored logs
         self.log_area.tag_config("INFO", foreground="black")
         self.log_area.tag_config("SUCCESS", foreground="green")
         self.log_area.tag_config("ERROR", foreground="red")
         self.log_area.tag_config("WARN", foreground="orange")
-        
+
         self.log("INFO", "Ready. Click the button to start the update process.")
 
     def log(self, level, message):
-        """Adds a message to the log area with a specific color."""
+        """Adds a message to the log area with a specific color. Must run on the Tk thread."""
         self.log_area.config(state="normal")
         self.log_area.insert(tk.END, f"{message}\n", level)
         self.log_area.config(state="disabled")
         self.log_area.see(tk.END) # Auto-scroll to the bottom
-        self.root.update_idletasks() # Refresh the GUI immediately
 
     def run_update_process(self):
-        """The main logic for updating the files."""
+        """Starts the update in a worker thread; its progress is relayed through a queue."""
         self.update_button.config(state="disabled")
         self.log_area.config(state="normal")
         self.log_area.delete(1.0, tk.END) # Clear previous logs
         self.log_area.config(state="disabled")
 
-        try:
-            self.log("INFO", "--- Starting update process ---")
-
-            # 1. Read CSV files into dictionaries for fast lookup
-            self.log("INFO", f"Reading {CSV_EN_PATH.name}...")
-            en_dict = self.read_csv_to_dict(CSV_EN_PATH)
-            self.log("INFO", f" -> Found {len(en_dict)} entries.")
-
-            self.log("INFO", f"Reading {CSV_JA_PATH.name}...")
-            ja_dict = self.read_csv_to_dict(CSV_JA_PATH)
-            self.log("INFO", f" -> Found {len(ja_dict)} entries.")
-
-            # 2. Read and FIX the override JSON
-            self.log("INFO", f"Reading and fixing {JSON_OVERRIDE_PATH.name}...")
-            with open(JSON_OVERRIDE_PATH, "r", encoding="utf-8") as f:
-                broken_json_string = f.read()
-
-            # --- The Magic Regex Fix ---
-            def fix_newlines_in_text(match):
-                content_with_newlines = match.group(1)
-                # Replace actual newlines with escaped '\n'
-                fixed_content = content_with_newlines.replace('\n', '\\n').replace('\r', '')
-                return f'"text": "{fixed_content}"'
-
-            # Find all "text": "..." blocks, even multi-line ones, and apply the fix
-            fixed_json_string = re.sub(r'"text":\s*"((?:\\"|[^"])*)"', fix_newlines_in_text, broken_json_string, flags=re.DOTALL)
-            
-            try:
-                # Parse the FIXED string
-                override_data = json.loads(fixed_json_string)
-                self.log("INFO", " -> JSON fixed and parsed successfully.")
-            except json.JSONDecodeError as e:
-                self.log("ERROR", f"Failed to parse JSON even after regex fix: {e}")
-                char_index = e.pos
-                context = 30
-                snippet = fixed_json_string[max(0, char_index - context):char_index + context]
-                self.log("WARN", f" -> Problem area (around char {char_index}): ...{snippet}...")
-                raise # Stop the process
-
-            # 3. Apply overrides
-            self.log("INFO", "Applying English overrides...")
-            en_overrides = override_data.get("languageOverridesConfig", {}).get("overrides", {}).get("English", {}).get("overrideEntries", [])
-            updated_en_count = self.apply_overrides(en_dict, en_overrides)
-            self.log("INFO", f" -> {updated_en_count} English entries updated or added.")
-
-            self.log("INFO", "Applying Japanese overrides...")
-            ja_overrides = override_data.get("languageOverridesConfig", {}).get("overrides", {}).get("Japanese", {}).get("overrideEntries", [])
-            updated_ja_count = self.apply_overrides(ja_dict, ja_overrides)
-            self.log("INFO", f" -> {updated_ja_count} Japanese entries updated or added.")
-
-            # 4. Write the updated dictionaries back to CSV files
-            self.log("INFO", f"Writing updated data to {CSV_EN_PATH.name}...")
-            self.write_dict_to_csv(CSV_EN_PATH, en_dict)
-            self.log("INFO", " -> English file saved.")
-            
-            self.log("INFO", f"Writing updated data to {CSV_JA_PATH.name}...")
-            self.write_dict_to_csv(CSV_JA_PATH, ja_dict)
-            self.log("INFO", " -> Japanese file saved.")
-
-            self.log("SUCCESS", "\n--- Update process completed successfully! ---")
+        self.worker = threading.Thread(target=self.update_worker, daemon=True)
+        self.worker.start()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_messages)
 
+    def update_worker(self):
+        # Tk widgets are not thread-safe, so the worker only ever touches the queue.
+        def progress(level, message): self.messages.put((level, message))
+        try:
+            update_language_files(progress)
         except Exception as e:
-            self.log("ERROR", f"\n--- AN ERROR OCCURRED ---")
-            self.log("ERROR", f"Error Type: {type(e).__name__}")
-            self.log("ERROR", f"Message: {e}")
-            self.log("WARN", "\n--- Traceback ---")
-            self.log("WARN", traceback.format_exc())
-        
-        finally:
+            progress("ERROR", f"\n--- AN ERROR OCCURRED ---")
+            progress("ERROR", f"Error Type: {type(e).__name__}")
+            progress("ERROR", f"Message: {e}")
+            progress("WARN", "\n--- Traceback ---")
+            progress("WARN", traceback.format_exc())
+
+    def poll_messages(self):
+        while True:
+            try: level, message = self.messages.get_nowait()
+            except queue.Empty: break
+            self.log(level, message)
+        if self.worker.is_alive():
+            self.root.after(self.POLL_INTERVAL_MS, self.poll_messages)
+        elif self.messages.empty():
             self.update_button.config(state="normal")
-    
-    def read_csv_to_dict(self, file_path):
-        """Reads a 2-column CSV file into a dictionary, using UPPERCASE keys."""
-        data_dict = {}
-        with open(file_path, "r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f)
-            try:
-                # Read the header to know the column names
-                header = [h.upper() for h in next(reader)] 
-            except StopIteration:
-                return {} # Return empty dict for empty file
-            
-            # Find the index of KEY and TEXT columns
-            try:
-                key_index = header.index('KEY')
-                text_index = header.index('TEXT')
-            except ValueError:
-                self.log("ERROR", f"CSV file {file_path.name} must have 'KEY' and 'TEXT' columns.")
-                raise
-                
-            for row in reader:
-                if len(row) > max(key_index, text_index):
-                    data_dict[row[key_index]] = row[text_index]
-        return data_dict
-
-    def apply_overrides(self, data_dict, override_list):
-        """Updates a dictionary with a list of override entries."""
-        count = 0
-        if override_list:
-            for entry in override_list:
-                # The JSON uses "key", but our dictionary uses the UPPERCASE "KEY"
-                # We use the JSON's "key" to find and update the entry in our dict.
-                data_dict[entry["key"]] = entry["text"]
-                count += 1
-        return count
-
-    def write_dict_to_csv(self, file_path, data_dict):
-        """Writes a dictionary back to a 2-column CSV file."""
-        with open(file_path, "w", encoding="utf-8", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["KEY", "TEXT"]) # Write header
-            for key, value in data_dict.items():
-                writer.writerow([key, value])
+        else:
+            self.root.after(0, self.poll_messages)
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = LanguageToolApp(root)
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Applies languageOverrides.json to English.csv and Japanese.csv.")
+    parser.add_argument("--headless", action="store_true", help="Run the update without the GUI.")
+    parser.add_argument("--dry-run", action="store_true", help="With --headless, only report which keys would change.")
+    args = parser.parse_args()
+    if args.headless or tk is None:
+        try:
+            update_language_files(dry_run=args.dry_run)
+        except Exception as e:
+            print_progress("ERROR", f"--- AN ERROR OCCURRED ---\n{type(e).__name__}: {e}")
+            sys.exit(1)
+    else:
+        root = tk.Tk()
+        app = LanguageToolApp(root)
+        root.mainloop()
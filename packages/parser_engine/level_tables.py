@@ -0,0 +1,95 @@
+# level_tables.py
+# Per-level value tables (hero_main.py --level-tables).
+#
+# The parsers only compute each placeholder at maxLevel. While they do, every value that
+# follows the usual "base + increment * (level - 1)" progression is recorded here as a term
+# (its base, increment, scaling and rounding). After Phase 2 all terms of the run are
+# evaluated at once for levels 1..maxLevel as one NumPy array, and saved as
+# hero_level_values.json: {hero_id: {block_id: {PLACEHOLDER: [level 1, ..., maxLevel]}}}.
+# Blocks with maxLevel 0 (e.g. nested specials) get an empty list.
+# A block id can repeat within a hero (or be missing, "None"); a term whose placeholder already
+# has a different curve under that id goes to "<block_id>#2", "#3", ... in recording order, so
+# no curve is overwritten. Recording the same curve again is not repeated.
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+# How the scaled value becomes the final one, mirroring the parsers' own arithmetic.
+OP_NONE, OP_TRUNC, OP_ROUND, OP_ABS_ROUND, OP_ATTACK_FLOOR = range(5)
+OPS = {"none": OP_NONE, "trunc": OP_TRUNC, "round": OP_ROUND, "abs_round": OP_ABS_ROUND, "attack_floor": OP_ATTACK_FLOOR}
+INTEGER_OPS = {OP_TRUNC, OP_ROUND, OP_ABS_ROUND, OP_ATTACK_FLOOR}
+
+class LevelTable:
+    """
+    Column-wise term storage: value(level) = op(((base - offset) + inc * (level - 1)) / divisor).
+    For OP_ATTACK_FLOOR the scaled value v becomes floor((v / 100) * attack) * multiplier.
+    """
+    def __init__(self):
+        self.hero_id = None
+        self.keys = [] # (hero_id, block_id, placeholder)
+        self.base, self.inc, self.offset, self.divisor = [], [], [], []
+        self.max_level, self.op, self.attack, self.multiplier = [], [], [], []
+
+    def record(self, block_id, placeholder: str, base, inc, max_level: int, op: str = "none", divisor=1, offset=0):
+        self.keys.append((self.hero_id, block_id, placeholder))
+        self.base.append(base); self.inc.append(inc); self.offset.append(offset); self.divisor.append(divisor)
+        self.max_level.append(max_level); self.op.append(OPS[op]); self.attack.append(0); self.multiplier.append(1)
+
+    def scale_last_by_attack(self, placeholder: str, attack, multiplier):
+        """Turns the most recent term for placeholder into an attack-scaled damage value."""
+        if not self.keys or self.keys[-1][2] != placeholder: return
+        self.op[-1] = OP_ATTACK_FLOOR; self.attack[-1] = attack; self.multiplier[-1] = multiplier
+
+    def __len__(self):
+        return len(self.keys)
+
+    def compute(self) -> np.ndarray:
+        """A (terms x highest maxLevel) array; levels above a term's own maxLevel are NaN."""
+        if not self.keys: return np.empty((0, 0))
+        max_level = np.asarray(self.max_level, dtype=np.int64)
+        steps = np.arange(max(1, int(max_level.max())), dtype=np.float64) # level - 1
+        base = np.asarray(self.base, dtype=np.float64)[:, None]
+        inc = np.asarray(self.inc, dtype=np.float64)[:, None]
+        offset = np.asarray(self.offset, dtype=np.float64)[:, None]
+        divisor = np.asarray(self.divisor, dtype=np.float64)[:, None]
+        # Same operation order as the parsers, so the maxLevel column matches their values exactly.
+        values = ((base - offset) + inc * steps[None, :]) / divisor
+
+        op = np.asarray(self.op)[:, None]
+        attack = np.asarray(self.attack, dtype=np.float64)[:, None]
+        multiplier = np.asarray(self.multiplier, dtype=np.float64)[:, None]
+        values = np.where(op == OP_TRUNC, np.trunc(values), values)
+        values = np.where(op == OP_ROUND, np.rint(values), values)
+        values = np.where(op == OP_ABS_ROUND, np.abs(np.rint(values)), values)
+        values = np.where(op == OP_ATTACK_FLOOR, np.floor((values / 100) * attack) * multiplier, values)
+        values[steps[None, :] >= max_level[:, None]] = np.nan
+        return values
+
+    def to_json(self) -> dict:
+        values = self.compute()
+        tables = {}
+        for row, ((hero_id, block_id, placeholder), max_level, op) in enumerate(zip(self.keys, self.max_level, self.op)):
+            curve = values[row, :max_level]
+            curve = [int(v) for v in curve] if op in INTEGER_OPS else curve.tolist()
+            blocks = tables.setdefault(hero_id, {})
+            block_key, n = str(block_id), 1
+            while blocks.get(block_key, {}).get(placeholder, curve) != curve:
+                n += 1; block_key = f"{block_id}#{n}"
+            blocks.setdefault(block_key, {})[placeholder] = curve
+        return tables
+
+def write_level_tables(table: LevelTable, output_path: Path):
+    print(f"\n--- Writing per-level value tables to {output_path.name} ---")
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        tables = table.to_json()
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, output_path)
+        curves = sum(len(placeholders) for blocks in tables.values() for placeholders in blocks.values())
+        print(f"Successfully saved {curves} value curves ({len(table)} recorded terms) for {len(tables)} heroes.")
+    except Exception as e:
+        print(f"FATAL: Failed to write per-level value tables: {e}")
@@ -0,0 +1,136 @@
+# memprofile.py
+# Memory profiling for hero_main.py --memprofile.
+#
+# main() calls checkpoint(name) at the end of every phase. Each checkpoint records, for the
+# phase that just ended: the traced memory still held and its peak during the phase
+# (tracemalloc), the process RSS, the allocation sites that grew the most since the previous
+# checkpoint, and the object types whose live counts grew the most. The result is printed as a
+# table and written as JSON (hero_memprofile.json).
+#
+# Phases whose parts run concurrently (the input sources are loaded in parallel) cannot be told
+# apart by snapshots; for those, checkpoint() is also given the objects each part produced and
+# records the bytes reachable from each of them.
+#
+# Tracing slows the run down noticeably, so it is only active with --memprofile; otherwise
+# every call is a no-op.
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import psutil # Optional; used for RSS where /proc is not available (Windows, macOS).
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes, or None if it cannot be read."""
+    if psutil is not None: return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _object_counts() -> Counter:
+    """
+    Live objects per type. gc only tracks containers, so the untracked items they hold directly
+    (strings, numbers, dicts of plain values) are counted through their containers; an item
+    held by several containers is counted once per container.
+    """
+    counts = Counter()
+    for obj in gc.get_objects():
+        counts[type(obj).__name__] += 1
+        items = [*obj.keys(), *obj.values()] if isinstance(obj, dict) else obj if isinstance(obj, (list, tuple, set, frozenset)) else ()
+        for item in items:
+            if not gc.is_tracked(item): counts[type(item).__name__] += 1
+    return counts
+
+
+def retained_size(obj) -> int:
+    """
+    Bytes of obj and everything reachable from it, each object counted once. Modules, classes
+    and functions are not followed; objects also held elsewhere (interned strings, small ints)
+    are included.
+    """
+    seen, total, stack = set(), 0, [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (type, types.ModuleType, types.FunctionType)): continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return total
+
+
+class MemoryProfiler:
+    def __init__(self, enabled: bool = False, top_n: int = 10):
+        self.enabled = enabled; self.top_n = top_n
+        self.phases = []
+        if not enabled: return
+        tracemalloc.start()
+        self._exclude = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                         tracemalloc.Filter(False, "<frozen importlib._bootstrap>"), tracemalloc.Filter(False, "<unknown>"))
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(self._exclude)
+        self._objects = _object_counts()
+        self._started = self._phase_started = time.perf_counter()
+
+    def checkpoint(self, phase: str, parts: dict = None):
+        """Records the phase that ends here; parts ({name: object}) are sized with retained_size()."""
+        if not self.enabled: return
+        elapsed = time.perf_counter() - self._phase_started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._exclude)
+        top_sites = [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_diff": stat.size_diff,
+             "size": stat.size, "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(self._snapshot, "lineno")[:self.top_n] if stat.size_diff > 0
+        ]
+        objects = _object_counts()
+        grown = (objects - self._objects).most_common(self.top_n)
+        self.phases.append({
+            "phase": phase, "seconds": round(elapsed, 3),
+            "traced_bytes": current, "peak_traced_bytes": peak, "rss_bytes": current_rss(),
+            "top_allocation_sites": top_sites,
+            "object_count_growth": [{"type": name, "count_diff": count, "count": objects[name]} for name, count in grown],
+        })
+        if parts: self.phases[-1]["retained_bytes"] = {name: retained_size(obj) for name, obj in parts.items()}
+        self._snapshot = snapshot; self._objects = objects
+        # The next phase's peak starts from what is held now.
+        tracemalloc.reset_peak()
+        self._phase_started = time.perf_counter()
+
+    def report(self, output_path: Path):
+        if not self.enabled: return
+        tracemalloc.stop()
+        print("\n--- 🧠 Memory Profile ---")
+        print(f"{'Phase':<26} {'Seconds':>8} {'Held MB':>9} {'Peak MB':>9} {'RSS MB':>8}")
+        for phase in self.phases:
+            rss = f"{phase['rss_bytes'] / MB:8.1f}" if phase["rss_bytes"] is not None else f"{'n/a':>8}"
+            print(f"{phase['phase']:<26} {phase['seconds']:8.2f} {phase['traced_bytes'] / MB:9.1f} {phase['peak_traced_bytes'] / MB:9.1f} {rss}")
+            for name, size in phase.get("retained_bytes", {}).items(): print(f"  -> {name:<23} {'':>8} {size / MB:9.1f}")
+        if self.phases:
+            worst = max(self.phases, key=lambda p: p["peak_traced_bytes"])
+            print(f"Highest peak: {worst['phase']} ({worst['peak_traced_bytes'] / MB:.1f} MB)")
+            for site in worst["top_allocation_sites"][:3]: print(f" -> {site['site']}: +{site['size_diff'] / MB:.1f} MB")
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0], "total_seconds": round(time.perf_counter() - self._started, 3),
+            "peak_traced_bytes": max((p["peak_traced_bytes"] for p in self.phases), default=0),
+            "phases": self.phases,
+        }
+        try:
+            with open(output_path, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"Memory profile saved to {output_path.name}.")
+        except Exception as e:
+            print(f"Warning: Could not write memory profile. Error: {e}")
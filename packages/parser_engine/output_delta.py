@@ -0,0 +1,128 @@
+# output_delta.py
+# Compares the rendered hero rows of this run (the rows of hero_skill_output*.csv) with the
+# previous run. Per-hero, per-field content hashes are kept in a small state file, and a
+# delta file lists the added, removed and changed heroes with only the fields that changed.
+# The same comparison is used between game-data versions processed in one run (--versions).
+
+import hashlib
+import json
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+STATE_VERSION = 1
+
+
+def _hash_text(text) -> str:
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def hash_rows(output_rows: list) -> dict:
+    """Returns {hero_id: {"hash": ..., "fields": {field: hash}}} for the rendered rows."""
+    hashes = {}
+    for row in output_rows:
+        fields = {field: _hash_text(value) for field, value in row.items() if field != "hero_id"}
+        combined = _hash_text("\0".join(f"{field}={fields[field]}" for field in sorted(fields)))
+        hashes[row["hero_id"]] = {"hash": combined, "fields": fields}
+    return hashes
+
+
+def load_hash_state(state_path: Path) -> dict:
+    if not state_path.exists(): return {}
+    try:
+        with open(state_path, "r", encoding="utf-8") as f: state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read '{state_path.name}', treating every hero as new. Error: {e}")
+        return {}
+    if state.get("version") != STATE_VERSION:
+        print(f"Warning: '{state_path.name}' has an unknown format, treating every hero as new.")
+        return {}
+    return state
+
+
+def build_delta(output_rows: list, current_hashes: dict, previous_state: dict) -> dict:
+    previous_hashes = previous_state.get("heroes", {})
+    added, changed = {}, {}
+    field_counts = Counter()
+    for row in output_rows:
+        hero_id = row["hero_id"]
+        current = current_hashes[hero_id]
+        previous = previous_hashes.get(hero_id)
+        if previous is None:
+            added[hero_id] = {field: value for field, value in row.items() if field != "hero_id"}
+            continue
+        if previous["hash"] == current["hash"]: continue
+        changed_fields = {
+            field: row[field] for field, field_hash in current["fields"].items()
+            if previous["fields"].get(field) != field_hash
+        }
+        # Fields that existed last run but not in this one are reported as emptied.
+        changed_fields.update({field: "" for field in previous["fields"] if field not in current["fields"]})
+        field_counts.update(changed_fields.keys())
+        changed[hero_id] = {"hero_name": row.get("hero_name"), "fields": changed_fields}
+    removed = [hero_id for hero_id in previous_hashes if hero_id not in current_hashes]
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "previous_generated_at": previous_state.get("generated_at"),
+        "summary": {
+            "added": len(added), "removed": len(removed), "changed": len(changed),
+            "unchanged": len(current_hashes) - len(added) - len(changed),
+            "changed_fields": dict(field_counts.most_common()),
+        },
+        "added": added, "removed": removed, "changed": changed,
+    }
+
+
+def _write_json_atomic(data, output_path: Path, indent=None):
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(temp_path, output_path)
+
+
+def write_output_delta(output_rows: list, state_path: Path, delta_path: Path) -> dict:
+    """Writes delta_path for this run against state_path, then updates state_path. Returns the summary."""
+    print(f"\n--- Comparing rendered output with the previous run ---")
+    try:
+        previous_state = load_hash_state(state_path)
+        current_hashes = hash_rows(output_rows)
+        delta = build_delta(output_rows, current_hashes, previous_state)
+        _write_json_atomic(delta, delta_path, indent=2)
+        _write_json_atomic({"version": STATE_VERSION, "generated_at": delta["generated_at"], "heroes": current_hashes}, state_path)
+    except Exception as e:
+        print(f"FATAL: Failed to write output delta: {e}")
+        return {}
+    summary = delta["summary"]
+    if not previous_state:
+        print(f"No previous run found. All {summary['added']} heroes are reported as added.")
+    else:
+        print(f"Added: {summary['added']} | Removed: {summary['removed']} | Changed: {summary['changed']} | Unchanged: {summary['unchanged']}")
+        for field, count in summary["changed_fields"].items():
+            print(f" -> {field:<15} changed in {count} heroes")
+    print(f"Delta saved to {delta_path.name}.")
+    return summary
+
+
+def write_version_comparison(from_label: str, from_rows: list, to_label: str, to_rows: list,
+                             output_path: Path, source_changed: list = None) -> dict:
+    """
+    Writes the delta from one version's rendered rows to another's. source_changed lists the
+    heroes whose resolved data or stats differ, including ones whose text did not change.
+    """
+    print(f"\n--- Comparing version {from_label} -> {to_label} ---")
+    try:
+        delta = build_delta(to_rows, hash_rows(to_rows), {"heroes": hash_rows(from_rows)})
+        del delta["previous_generated_at"]
+        delta = {"from_version": from_label, "to_version": to_label, **delta}
+        if source_changed is not None:
+            delta["summary"]["source_changed"] = len(source_changed)
+            delta["source_changed"] = source_changed
+        _write_json_atomic(delta, output_path, indent=2)
+    except Exception as e:
+        print(f"FATAL: Failed to write version comparison: {e}")
+        return {}
+    summary = delta["summary"]
+    print(f"Added: {summary['added']} | Removed: {summary['removed']} | Changed: {summary['changed']} | Unchanged: {summary['unchanged']}")
+    print(f"Comparison saved to {output_path.name}.")
+    return summary
@@ -0,0 +1,92 @@
+# output_shards.py
+# Writes the rendered hero rows (the rows of hero_skill_output*.csv) as content-addressed JSON
+# files for the site build (hero_main.py --json-shards). Unlike the 600-row CSV chunks, a hero
+# always lands in the same file: either its own file, or the shard its id hashes to. Each file
+# name carries the hash of its content, so only files whose content changed get a new name, and
+# manifest.json maps every hero to its current file.
+#
+#   heroes_json/manifest.json              {"heroes": {hero_id: file}, "files": {file: {...}}, ...}
+#   heroes_json/shard_007.3f9a1c2e4b5d6f70.json     with --json-shards N   (N > 0)
+#   heroes_json/ninja_osamu.8c1d2e3f4a5b6c7d.json   with --json-shards 0   (one file per hero)
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def shard_of(hero_id: str, shards: int) -> int:
+    """Stable shard index of a hero; it only depends on the id and the shard count."""
+    return int(_hash_bytes(hero_id.encode("utf-8")), 16) % shards
+
+
+def _file_groups(output_rows: list, shards: int) -> dict:
+    """{file stem: {hero_id: row}}, heroes sorted by id inside each file."""
+    groups = {}
+    for row in sorted(output_rows, key=lambda r: r["hero_id"]):
+        stem = f"shard_{shard_of(row['hero_id'], shards):03d}" if shards else re.sub(r"[^\w-]", "_", row["hero_id"])
+        groups.setdefault(stem, {})[row["hero_id"]] = row
+    return groups
+
+
+def _load_manifest(manifest_path: Path) -> dict:
+    if not manifest_path.exists(): return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f: manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def write_json_shards(output_rows: list, output_dir: Path, shards: int = 64) -> dict:
+    """
+    Writes the files that are new or changed, then the manifest, then removes the files the
+    previous manifest listed that are no longer used. Returns the manifest.
+    """
+    print(f"\n--- Writing hero JSON {'shards' if shards else 'files'} to {output_dir.name}/ ---")
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = output_dir / MANIFEST_FILENAME
+        previous_files = set(_load_manifest(manifest_path).get("files", {}))
+
+        heroes, files, written = {}, {}, 0
+        for stem, rows in _file_groups(output_rows, shards).items():
+            data = json.dumps(rows, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+            content_hash = _hash_bytes(data)
+            file_name = f"{stem}.{content_hash}.json"
+            # The name is derived from the content, so an existing file is already up to date.
+            if not (output_dir / file_name).exists():
+                temp_path = output_dir / (file_name + ".tmp")
+                with open(temp_path, "wb") as f: f.write(data)
+                os.replace(temp_path, output_dir / file_name)
+                written += 1
+            files[file_name] = {"hash": content_hash, "heroes": len(rows), "bytes": len(data)}
+            for hero_id in rows: heroes[hero_id] = file_name
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "shards": shards,
+            "heroes": heroes,
+            "files": dict(sorted(files.items())),
+        }
+        temp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f: json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+
+        stale = previous_files - set(files)
+        for file_name in stale: (output_dir / file_name).unlink(missing_ok=True)
+    except Exception as e:
+        print(f"FATAL: Failed to write hero JSON files: {e}")
+        return {}
+    print(f"{len(files)} files for {len(heroes)} heroes | Written: {written} | Unchanged: {len(files) - written} | Removed: {len(stale)}")
+    return manifest
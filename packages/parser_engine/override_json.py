@@ -0,0 +1,142 @@
+# override_json.py
+# Streaming reader for languageOverrides.json, shared by hero_data_loader.py and lang_override.py.
+#
+# The file is edited by hand and its "text" values routinely contain raw line breaks, which
+# strict JSON rejects. Instead of regex-rewriting the whole document and parsing it in one
+# go, the file is read in chunks and each override entry is decoded (accepting raw line
+# breaks inside string literals) and yielded as soon as it has been read. Errors carry the
+# character offset of the problem in the original file.
+
+import json
+import re
+
+READ_CHUNK_SIZE = 1 << 16
+LANGUAGES = ("English", "Japanese")
+
+# Both alternatives start with different characters, so matching a literal never backtracks.
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_WHITESPACE = " \t\r\n"
+# How close to the end of the buffer a value must end, or an error occur, to be treated as cut off
+# (and decoded again with the next chunk) rather than complete or a real syntax error.
+_TRUNCATION_MARGIN = 6 # long enough for a partial '\uXXXX' escape
+
+
+class OverrideParseError(ValueError):
+    """A malformed languageOverrides.json; offset is the character offset in the original file."""
+    def __init__(self, message: str, offset: int, line: int):
+        super().__init__(f"{message} (char {offset}, line {line})")
+        self.offset = offset
+        self.line = line
+
+
+def _normalize_line_breaks(match) -> str:
+    return match.group(0).replace("\r\n", "\n").replace("\r", "\n")
+
+
+class _Scanner:
+    # strict=False accepts raw control characters inside strings, so a raw line break decodes
+    # to the same '\n' the escaped form would. Only '\r' needs a separate pass.
+    decoder = json.JSONDecoder(strict=False)
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""; self.pos = 0
+        self.base = 0 # original offset of buffer[0]
+        self.line_base = 1 # line number of buffer[0]
+        self.eof = False
+
+    def fill(self, keep_from: int = None) -> bool:
+        """Drops the consumed prefix (up to keep_from, if given) and appends the next chunk. Returns False at EOF."""
+        chunk = self.f.read(READ_CHUNK_SIZE)
+        if not chunk: self.eof = True; return False
+        drop = self.pos if keep_from is None else keep_from
+        self.line_base += self.buffer.count("\n", 0, drop)
+        self.base += drop
+        self.buffer = self.buffer[drop:] + chunk; self.pos -= drop
+        return True
+
+    def error(self, message: str, buffer_pos: int = None):
+        if buffer_pos is None: buffer_pos = self.pos
+        line = self.line_base + self.buffer.count("\n", 0, buffer_pos)
+        return OverrideParseError(message, self.base + buffer_pos, line)
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character ('' at EOF) without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE: self.pos += 1
+            if self.pos < len(self.buffer): return self.buffer[self.pos]
+            if not self.fill(): return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char: raise self.error(f"Expected '{char}' but found '{found or 'EOF'}'")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decodes the JSON value at the cursor, reading more of the file while it is incomplete."""
+        self.peek()
+        while True:
+            start = self.pos
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, start)
+                # A number close to the buffer edge may continue in the next chunk ('1' + '.25',
+                # '1e' + '-3'), so it is decoded again once more of the file has been read.
+                if len(self.buffer) - end >= _TRUNCATION_MARGIN or self.eof or not self.fill(keep_from=start): break
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self.buffer) - _TRUNCATION_MARGIN or e.msg.startswith("Unterminated string")
+                if self.eof or not truncated or not self.fill(keep_from=start):
+                    raise self.error(f"Malformed JSON: {e.msg}", e.pos) from None
+        text = self.buffer[start:end]
+        self.pos = end
+        if "\r" in text: value = json.loads(_STRING_LITERAL.sub(_normalize_line_breaks, text), strict=False)
+        return value
+
+    def iter_object(self):
+        """Yields each key of the object at the cursor. The caller consumes every value before resuming."""
+        self.expect("{")
+        if self.peek() == "}": self.pos += 1; return
+        while True:
+            if self.peek() != '"': raise self.error("Expected an object key")
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",": self.pos += 1; continue
+            self.expect("}")
+            return
+
+    def iter_array(self):
+        """Yields (offset, decoded_item) for each item of the array at the cursor."""
+        self.expect("[")
+        if self.peek() == "]": self.pos += 1; return
+        while True:
+            self.peek()
+            offset = self.base + self.pos
+            yield offset, self.decode_value()
+            if self.peek() == ",": self.pos += 1; continue
+            self.expect("]")
+            return
+
+
+def iter_override_entries(json_path, languages=LANGUAGES, warn=print):
+    """
+    Yields (language, entry) for every entry under
+    languageOverridesConfig.overrides.<language>.overrideEntries, in file order.
+    Raises OverrideParseError for malformed JSON. Entries without 'key' and 'text' are
+    skipped and reported through warn(message).
+    """
+    # newline="" keeps '\r' untranslated, so offsets match the file exactly.
+    with open(json_path, "r", encoding="utf-8", newline="") as f:
+        scanner = _Scanner(f)
+        for key in scanner.iter_object():
+            if key != "languageOverridesConfig": scanner.decode_value(); continue
+            for key in scanner.iter_object():
+                if key != "overrides": scanner.decode_value(); continue
+                for language in scanner.iter_object():
+                    if language not in languages: scanner.decode_value(); continue
+                    for key in scanner.iter_object():
+                        if key != "overrideEntries": scanner.decode_value(); continue
+                        for start, entry in scanner.iter_array():
+                            if not isinstance(entry, dict) or "key" not in entry or "text" not in entry:
+                                warn(f"Warning: Skipping {language} override entry without 'key' and 'text' at char {start}.")
+                                continue
+                            yield language, entry
@@ -6,8 +6,10 @@ from hero_parser import (
     find_best_lang_id, 
     _find_and_parse_extra_description,
     generate_description, 
-    format_value
+    format_value,
+    record_level_term
 )
+from diagnostics import warning_event
 
 def parse_chain_strike(prop_data: dict, special_data: dict, hero_stats: dict, lang_db: dict, game_db: dict, hero_id: str, rules: dict, parsers: dict) -> (list, list):
     """
@@ -26,7 +28,7 @@ def parse_chain_strike(prop_data: dict, special_data: dict, hero_stats: dict, la
         prop_lang_subset = parsers.get('prop_lang_subset', [k for k in lang_db if k.startswith("specials.v2.property.")])
         initial_hit_lang_id, warning = find_best_lang_id({"propertyType": initial_hit_prop_type}, prop_lang_subset, parsers)
         if warning: 
-            warnings.append(f"[parse_chain_strike]: Initial hit warning for '{prop_id}': {warning}")
+            warnings.append(warning_event("parse_chain_strike", "LANG_ID_NOT_FOUND", f"Initial hit warning for '{prop_id}': {warning}", prop_id))
         
         if initial_hit_lang_id:
             lang_params = {}
@@ -34,13 +36,14 @@ def parse_chain_strike(prop_data: dict, special_data: dict, hero_stats: dict, la
             inc = search_context.get("powerMultiplierIncrementPerLevelPerMil", 0)
             val = (base + inc * (main_max_level - 1)) / 10.0
             lang_params["HEALTH"] = val
+            record_level_term(f"{prop_id}_initial", "HEALTH", base, inc, main_max_level, divisor=10)
             desc = generate_description(initial_hit_lang_id, {k: format_value(v) for k, v in lang_params.items()}, lang_db)
             parsed_items.append({"id": f"{prop_id}_initial", "lang_id": initial_hit_lang_id, "params": json.dumps(lang_params), **desc})
         else:
             # If initial hit fails, create a failure object
             failure_text = f"FAIL_LANG_ID: ChainStrike Initial Hit '{prop_id}'"
             parsed_items.append({"id": f"{prop_id}_initial", "lang_id": "SEARCH_FAILED", "en": failure_text, "ja": failure_text})
-            warnings.append(f"[parse_chain_strike]: Could not determine initial hit lang_id for {prop_id}")
+            warnings.append(warning_event("parse_chain_strike", "CHAIN_INITIAL_HIT_UNRESOLVED", f"Could not determine initial hit lang_id for {prop_id}", prop_id))
 
 
     # --- Part 2: Construct and parse the chain hit ---
@@ -78,6 +81,7 @@ def parse_chain_strike(prop_data: dict, special_data: dict, hero_stats: dict, la
             calculated_val = base_val + inc_val * (main_max_level - 1)
             if is_permil: calculated_val /= 10.0
             lang_params[p_holder] = calculated_val
+            record_level_term(f"{prop_id}_chain", p_holder, base_val, inc_val, main_max_level, divisor=10 if is_permil else 1)
 
         main_desc = generate_description(chain_lang_id, {k:format_value(v) for k,v in lang_params.items()}, lang_db)
         extra_info = _find_and_parse_extra_description(["specialproperty", "property"], base_name, search_context, main_params=lang_params, lang_db=lang_db, hero_id=hero_id, rules=rules, parsers=parsers)
@@ -88,6 +92,6 @@ def parse_chain_strike(prop_data: dict, special_data: dict, hero_stats: dict, la
         # If chain hit fails, create a failure object
         failure_text = f"FAIL_LANG_ID: ChainStrike Chain Hit '{prop_id}'"
         parsed_items.append({"id": f"{prop_id}_chain", "lang_id": "SEARCH_FAILED", "en": failure_text, "ja": failure_text})
-        warnings.append(f"[parse_chain_strike]: Could not construct or find any lang_id for property '{prop_id}'")
+        warnings.append(warning_event("parse_chain_strike", "CHAIN_HIT_UNRESOLVED", f"Could not construct or find any lang_id for property '{prop_id}'", prop_id))
         
     return parsed_items, warnings
\ No newline at end of file
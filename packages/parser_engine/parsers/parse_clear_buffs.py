@@ -1,10 +1,14 @@
 # packages/parser_engine/parsers/parse_clear_buffs.py
 
 from hero_parser import generate_description
+from diagnostics import warning_event
 
-def parse_clear_buffs(special_data: dict, lang_db: dict, parsers: dict) -> (dict, list):
+DEFAULT_LANG_PREFIX = "specials.v2.clearbuffs"
+
+def parse_clear_buffs(special_data: dict, lang_db: dict, rules: dict, parsers: dict) -> (dict, list):
     """
     Parses buff removal effects defined at the top level of a special.
+    The lang_id prefix comes from config.json's ADDITIONAL_SKILLS["buffToRemove"]["prefix"].
     Returns a tuple of (result_dict, warnings_list).
     """
     if "buffToRemove" not in special_data:
@@ -24,7 +28,8 @@ def parse_clear_buffs(special_data: dict, lang_db: dict, parsers: dict) -> (dict
         if not side_affected: side_affected = special_data.get("directEffect", {}).get("sideAffected", "").lower()
         if not side_affected: side_affected = "allies" if "debuff" in buff_to_remove else "enemies"
 
-        lang_id = f"specials.v2.clearbuffs.{buff_to_remove}.{target_type}.{side_affected}"
+        prefix = rules.get("additional_skills", {}).get("buffToRemove", {}).get("prefix") or DEFAULT_LANG_PREFIX
+        lang_id = f"{prefix}.{buff_to_remove}.{target_type}.{side_affected}"
         
         found_in_db = True
         if lang_id not in lang_db:
@@ -35,7 +40,7 @@ def parse_clear_buffs(special_data: dict, lang_db: dict, parsers: dict) -> (dict
 
         if not found_in_db:
             warning_msg = f"[parse_clear_buffs]: lang_id '{lang_id}' not found in lang_db."
-            warnings.append(warning_msg)
+            warnings.append(warning_event("parse_clear_buffs", "CLEAR_BUFFS_LANG_ID_MISSING", f"lang_id '{lang_id}' not found in lang_db.", special_data.get("id")))
             # Return a standardized failure object
             return {"id": "clear_buffs_effect", "lang_id": "SEARCH_FAILED", "en": warning_msg, "ja": warning_msg}, warnings
 
@@ -51,5 +56,5 @@ def parse_clear_buffs(special_data: dict, lang_db: dict, parsers: dict) -> (dict
         return result, warnings
 
     except Exception as e:
-        warnings.append(f"Error parsing clear_buffs for '{special_data.get('id', 'Unknown Special')}': {e}")
+        warnings.append(warning_event("parse_clear_buffs", "PARSER_EXCEPTION", f"Error parsing clear_buffs for '{special_data.get('id', 'Unknown Special')}': {e}", special_data.get("id")))
         return None, warnings
\ No newline at end of file
@@ -7,8 +7,10 @@ from hero_parser import (
     find_and_calculate_value, 
     _find_and_parse_extra_description,
     generate_description, 
-    format_value
+    format_value,
+    record_level_term
 )
+from diagnostics import warning_event
 # We need to import the status_effects parser to delegate tasks to it.
 from .parse_status_effects import parse_status_effects
 
@@ -42,10 +44,10 @@ def parse_familiars(familiars_list: list, special_data: dict, hero_stats: dict,
             lang_id, warning = (find_best_lang_id(familiar_instance, primary_candidates, parsers) if primary_candidates 
                               else find_best_lang_id(familiar_instance, all_familiar_lang_ids, parsers))
             if warning:
-                warnings.append(f"[parse_familiars]: {warning}") # Add source
+                warnings.append(warning_event("parse_familiars", "LANG_ID_NOT_FOUND", warning, familiar_id))
 
         if not lang_id:
-            warnings.append(f"[parse_familiars]: Could not find summon description for familiar '{familiar_id}'")
+            warnings.append(warning_event("parse_familiars", "FAMILIAR_DESCRIPTION_MISSING", f"Could not find summon description for familiar '{familiar_id}'", familiar_id))
             failure_text = f"FAIL_LANG_ID: Familiar '{familiar_id}'"
             parsed_items.append({"id": familiar_id, "lang_id": "SEARCH_FAILED", "en": failure_text, "ja": failure_text})
             continue
@@ -55,6 +57,7 @@ def parse_familiars(familiars_list: list, special_data: dict, hero_stats: dict,
         placeholders = set(re.findall(r'\{(\w+)\}', lang_db.get(lang_id,{}).get("en","")))
         health_val = familiar_instance.get('healthPerMil',0); inc_val_health = familiar_instance.get('healthPerLevelPerMil',0)
         lang_params['FAMILIARHEALTHPERCENT'] = (health_val + inc_val_health * (main_max_level - 1)) / 10.0
+        record_level_term(familiar_id, 'FAMILIARHEALTHPERCENT', health_val, inc_val_health, main_max_level, divisor=10)
         attack_found = False
         if effects_for_attack := familiar_instance.get('effects'):
             for effect in effects_for_attack:
@@ -62,6 +65,7 @@ def parse_familiars(familiars_list: list, special_data: dict, hero_stats: dict,
                     attack_val = effect.get('attackPercentPerMil',0)
                     inc_val_attack = effect.get('attackPercentIncrementPerLevelPerMil', 0)
                     lang_params['FAMILIARATTACK'] = (attack_val + inc_val_attack * (main_max_level - 1)) / 10.0
+                    record_level_term(familiar_id, 'FAMILIARATTACK', attack_val, inc_val_attack, main_max_level, divisor=10)
                     attack_found = True; break
         for p_holder in placeholders - set(lang_params.keys()):
             value, _ = find_and_calculate_value(p_holder, familiar_instance, main_max_level, hero_id, rules, is_modifier=False, ignore_keywords=['monster'])
@@ -122,7 +126,7 @@ def parse_simple_familiar_effect(effect_data: dict, familiar_instance: dict, lan
     primary_candidates = [k for k in all_effect_lang_ids if effect_type_keyword in k]
     lang_id, warning = (find_best_lang_id(context_block, primary_candidates, parsers) if primary_candidates else find_best_lang_id(context_block, all_effect_lang_ids, parsers))
     if warning:
-        warnings.append(f"[parse_simple_familiar_effect]: {warning}") # Add source
+        warnings.append(warning_event("parse_simple_familiar_effect", "LANG_ID_NOT_FOUND", warning, effect_id))
     
     if not lang_id:
         failure_text = f"FAIL_LANG_ID: FamiliarEffect '{effect_id}'"
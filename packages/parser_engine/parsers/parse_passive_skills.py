@@ -5,10 +5,12 @@ import re
 import math
 from hero_parser import (
     _collect_keywords_recursively,
+    lang_key_tokens,
     find_and_calculate_value,
     generate_description, 
     format_value
 )
+from diagnostics import warning_event
 
 def parse_passive_skills(passive_skills_list: list, hero_stats: dict, lang_db: dict, game_db: dict, hero_id: str, rules: dict, parsers: dict) -> (list, list):
     if not passive_skills_list: return [], []
@@ -16,6 +18,7 @@ def parse_passive_skills(passive_skills_list: list, hero_stats: dict, lang_db: d
     main_max_level = parsers.get("main_max_level", 8)
     title_lang_subset = [k for k in lang_db if k.startswith("herocard.passive_skill.title.")]
     desc_lang_subset = [k for k in lang_db if k.startswith("herocard.passive_skill.description.")]
+    key_tokens = parsers.get('lang_key_tokens') or {}
     
     for skill_data in passive_skills_list:
         if not isinstance(skill_data, dict): continue
@@ -27,7 +30,7 @@ def parse_passive_skills(passive_skills_list: list, hero_stats: dict, lang_db: d
         title_candidates = [k for k in title_lang_subset if k.startswith(prefix)]
         if title_candidates:
             skill_keywords = {kw for kw, depth in _collect_keywords_recursively(skill_data)}
-            title_scores = [{'key':c,'score':sum(1 for kw in skill_keywords if kw in c.split('.'))} for c in title_candidates]
+            title_scores = [{'key':c,'score':len(skill_keywords & lang_key_tokens(c, key_tokens))} for c in title_candidates]
             if title_scores: title_lang_id = sorted(title_scores, key=lambda x:(-x['score'],len(x['key'])))[0]['key']
             
         desc_lang_id = None
@@ -39,7 +42,7 @@ def parse_passive_skills(passive_skills_list: list, hero_stats: dict, lang_db: d
                 desc_candidates = [k for k in desc_lang_subset if k.startswith(prefix)]
                 if desc_candidates:
                     skill_keywords = {kw for kw, depth in _collect_keywords_recursively(skill_data)}
-                    refined_candidates = [c for c in desc_candidates if any(kw in c.split('.') for kw in skill_keywords)]
+                    refined_candidates = [c for c in desc_candidates if not skill_keywords.isdisjoint(lang_key_tokens(c, key_tokens))]
                     if refined_candidates: desc_lang_id = min(refined_candidates, key=len)
                     elif desc_candidates: desc_lang_id = min(desc_candidates, key=len)
                     
@@ -66,8 +69,7 @@ def parse_passive_skills(passive_skills_list: list, hero_stats: dict, lang_db: d
             })
         else:
             # --- MODIFIED: Standardize the warning and failure object ---
-            warning_msg = f"[parse_passive_skills]: Could not resolve passive lang_ids for skill '{skill_id}'"
-            warnings.append(warning_msg)
+            warnings.append(warning_event("parse_passive_skills", "PASSIVE_LANG_ID_UNRESOLVED", f"Could not resolve passive lang_ids for skill '{skill_id}'", skill_id))
             
             failure_text = f"FAIL_LANG_ID: type='{skill_type}', id='{skill_id}'"
             parsed_items.append({
@@ -10,6 +10,7 @@ from hero_parser import (
     generate_description, 
     format_value
 )
+from diagnostics import warning_event
 # Import other parsers for recursive calls
 from .parse_status_effects import parse_status_effects
 
@@ -56,7 +57,7 @@ def parse_properties(properties_list: list, special_data: dict, hero_stats: dict
             lang_id, warning = find_best_lang_id(prop_data, prop_lang_subset, parsers, parent_block=special_data)
             if warning:
                 # Add the source parser's name to the warning
-                warnings.append(f"[parse_properties]: {warning}")
+                warnings.append(warning_event("parse_properties", "LANG_ID_NOT_FOUND", warning, prop_id))
         
         if not lang_id:
             failure_text = f"FAIL_LANG_ID: type='{property_type}', id='{prop_id}'"
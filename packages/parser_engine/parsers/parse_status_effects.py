@@ -8,8 +8,10 @@ from hero_parser import (
     find_and_calculate_value, 
     _find_and_parse_extra_description,
     generate_description, 
-    format_value
+    format_value,
+    scale_last_level_term_by_attack
 )
+from diagnostics import warning_event
 
 def parse_status_effects(status_effects_list: list, special_data: dict, hero_stats: dict, lang_db: dict, game_db: dict, hero_id: str, rules: dict, parsers: dict, search_prefix: str = "specials.v2.statuseffect.") -> (list, list):
     if not status_effects_list: return [], []
@@ -28,7 +30,7 @@ def parse_status_effects(status_effects_list: list, special_data: dict, hero_sta
             lang_id, warning = find_best_lang_id(combined_details, se_lang_subset, parsers, parent_block=special_data)
             if warning:
                 # Add the source parser's name to the warning
-                warnings.append(f"[parse_status_effects]: {warning}")
+                warnings.append(warning_event("parse_status_effects", "LANG_ID_NOT_FOUND", warning, effect_id))
         
         if not lang_id:
             failure_text = f"FAIL_LANG_ID: type='{combined_details.get('statusEffect', '')}', id='{effect_id}'"
@@ -48,6 +50,7 @@ def parse_status_effects(status_effects_list: list, special_data: dict, hero_sta
                     turns_for_calc = combined_details.get("turns",0)
                     damage_per_turn = math.floor((value/100) * hero_stats.get("max_attack",0))
                     lang_params[p_holder] = damage_per_turn * (turns_for_calc or 1) if "over {TURNS} turns" in template_text else damage_per_turn
+                    scale_last_level_term_by_attack(p_holder, hero_stats.get("max_attack",0), (turns_for_calc or 1) if "over {TURNS} turns" in template_text else 1)
                 else: lang_params[p_holder] = value
                 
         main_desc = generate_description(lang_id, {k:format_value(v) for k,v in lang_params.items()}, lang_db)
@@ -0,0 +1,421 @@
+# packages/parser_engine/query_engine.py
+# A small structural query engine over resolved hero data (debug_hero_data.json).
+# Shared by api_server/main.py and tool/extract_learning_data.py.
+#
+# Query language (keywords are case-insensitive, string comparisons too):
+#   propertyType=ChainStrike            key equals value (numbers compare numerically)
+#   propertyType~chain                  key contains keyword (the classic /api/query search)
+#   statusEffect=~"^(poison|burn)$"     key matches a regular expression
+#   powerMultiplierPerMil>=1000         numeric comparison: >, >=, <, <=
+#   powerMultiplierPerMil=1000..3000    inclusive numeric range
+#   has(extraHitChancePerMil)           key is present
+#   parent(propertyType~chain)          the enclosing block matches
+#   ancestor(id=trick_of_the_trade)     any enclosing block matches
+#   child(statusEffect=Poison)          some nested block matches
+#   a AND b, a OR b, NOT a, ( ... )     boolean combinators (AND binds tighter than OR)
+# A list value matches when any of its elements matches.
+
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_ROOTS = ("specialId_details",)
+PARALLEL_MIN_HEROES = 200
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for malformed query text, with the character offset of the problem."""
+    def __init__(self, message: str, offset: int):
+        super().__init__(f"{message} (at offset {offset})")
+        self.offset = offset
+
+
+# --- Tokenizer ---
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<string>"(?:\\.|[^"\\])*")
+  | (?P<op>=~|>=|<=|\.\.|[=~<>(),])
+  | (?P<word>[^\s"=~<>(),]+?(?=\.\.|[\s"=~<>(),]|$))
+''', re.VERBOSE)
+
+def _tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens = []; pos = 0
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m: raise QuerySyntaxError(f"Unexpected character '{text[pos]}'", pos)
+        kind = m.lastgroup
+        if kind == "string":
+            tokens.append(("string", re.sub(r'\\(.)', r'\1', m.group()[1:-1]), pos))
+        elif kind != "ws":
+            tokens.append((kind, m.group(), pos))
+        pos = m.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+
+# --- Predicate Nodes ---
+def _scalars(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool): return None
+    if isinstance(value, (int, float)): return float(value)
+    if isinstance(value, str):
+        try: return float(value)
+        except ValueError: return None
+    return None
+
+def _normalize_scalar(value):
+    """
+    The form a scalar takes in the index: (kind, value) with kind "b", "n" or "s", floats for
+    numbers and lowercased strings. The kind keeps True/1.0 and False/0.0 (equal as dict keys)
+    in separate entries.
+    """
+    if isinstance(value, bool): return ("b", value)
+    if isinstance(value, (int, float)): return ("n", float(value))
+    if isinstance(value, str): return ("s", value.lower())
+    return None
+
+class Node:
+    def matches(self, block: dict, parents: list) -> bool:
+        raise NotImplementedError
+    def candidates(self, index: "QueryIndex") -> Optional[Set[str]]:
+        """Heroes that could possibly match, or None when the index cannot narrow it down."""
+        return None
+
+class FieldNode(Node):
+    def __init__(self, key: str):
+        self.key = key
+    def value_matches(self, value) -> bool:
+        raise NotImplementedError
+    def matches(self, block, parents):
+        if self.key not in block: return False
+        return any(self.value_matches(v) for v in _scalars(block[self.key]))
+    def candidates(self, index):
+        heroes = set()
+        for (_, value), hero_ids in index.values_by_key.get(self.key, {}).items():
+            if self.value_matches(value): heroes |= hero_ids
+        return heroes
+
+class Equals(FieldNode):
+    def __init__(self, key, raw: str):
+        super().__init__(key)
+        self.text = raw.lower(); self.number = _as_number(raw)
+        self.boolean = {"true": True, "false": False}.get(self.text)
+    def value_matches(self, value):
+        if isinstance(value, bool): return value == self.boolean
+        if isinstance(value, (int, float)): return self.number is not None and float(value) == self.number
+        return isinstance(value, str) and value.lower() == self.text
+    def candidates(self, index):
+        values = index.values_by_key.get(self.key, {})
+        heroes = set(values.get(("s", self.text), ()))
+        if self.number is not None: heroes |= values.get(("n", self.number), set())
+        if self.boolean is not None: heroes |= values.get(("b", self.boolean), set())
+        return heroes
+
+class Contains(FieldNode):
+    def __init__(self, key, keyword: str):
+        super().__init__(key); self.keyword = keyword.lower()
+    def value_matches(self, value):
+        return isinstance(value, str) and self.keyword in value.lower()
+
+class Regex(FieldNode):
+    def __init__(self, key, pattern: str, offset: int):
+        super().__init__(key)
+        try: self.pattern = re.compile(pattern, re.IGNORECASE)
+        except re.error as e: raise QuerySyntaxError(f"Invalid regular expression '{pattern}': {e}", offset)
+    def value_matches(self, value):
+        return isinstance(value, str) and self.pattern.search(value) is not None
+
+class NumericRange(FieldNode):
+    def __init__(self, key, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        super().__init__(key)
+        self.low, self.high = low, high
+        self.low_inclusive, self.high_inclusive = low_inclusive, high_inclusive
+    def value_matches(self, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)): return False
+        if self.low is not None and (value < self.low or (value == self.low and not self.low_inclusive)): return False
+        if self.high is not None and (value > self.high or (value == self.high and not self.high_inclusive)): return False
+        return True
+
+class Has(Node):
+    def __init__(self, key):
+        self.key = key
+    def matches(self, block, parents):
+        return self.key in block
+    def candidates(self, index):
+        return set(index.heroes_by_key.get(self.key, ()))
+
+class And(Node):
+    def __init__(self, children):
+        self.children = children
+    def matches(self, block, parents):
+        return all(c.matches(block, parents) for c in self.children)
+    def candidates(self, index):
+        result = None
+        for child in self.children:
+            heroes = child.candidates(index)
+            if heroes is not None: result = heroes if result is None else result & heroes
+        return result
+
+class Or(Node):
+    def __init__(self, children):
+        self.children = children
+    def matches(self, block, parents):
+        return any(c.matches(block, parents) for c in self.children)
+    def candidates(self, index):
+        result = set()
+        for child in self.children:
+            heroes = child.candidates(index)
+            if heroes is None: return None
+            result |= heroes
+        return result
+
+class Not(Node):
+    def __init__(self, child):
+        self.child = child
+    def matches(self, block, parents):
+        return not self.child.matches(block, parents)
+
+class Parent(Node):
+    def __init__(self, child):
+        self.child = child
+    def matches(self, block, parents):
+        return bool(parents) and self.child.matches(parents[-1], parents[:-1])
+    def candidates(self, index):
+        return self.child.candidates(index)
+
+class Ancestor(Parent):
+    def matches(self, block, parents):
+        return any(self.child.matches(parents[i], parents[:i]) for i in range(len(parents) - 1, -1, -1))
+
+class Child(Parent):
+    def matches(self, block, parents):
+        stack = [(v, [*parents, block]) for v in block.values() if isinstance(v, (dict, list))]
+        while stack:
+            item, item_parents = stack.pop()
+            if isinstance(item, list):
+                stack.extend((v, item_parents) for v in item if isinstance(v, (dict, list)))
+                continue
+            if self.child.matches(item, item_parents): return True
+            stack.extend((v, [*item_parents, item]) for v in item.values() if isinstance(v, (dict, list)))
+        return False
+
+
+# --- Parser ---
+_FUNCTIONS = {"parent": Parent, "ancestor": Ancestor, "child": Child}
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text); self.i = 0
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.i + offset, len(self.tokens) - 1)]
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind
+            raise QuerySyntaxError(f"Expected {expected!r} but found {token[1] or 'end of query'!r}", token[2])
+        self.i += 1
+        return token
+
+    def is_keyword(self, word):
+        token = self.peek()
+        return token[0] == "word" and token[1].upper() == word
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        self.take("end")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.is_keyword("OR"):
+            self.take(); children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.is_keyword("AND"):
+            self.take(); children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        if self.is_keyword("NOT"):
+            self.take(); return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.peek()
+        if token[:2] == ("op", "("):
+            self.take(); node = self.parse_or(); self.take("op", ")")
+            return node
+        key = self.take("word")[1]
+        if self.peek()[:2] == ("op", "("):
+            self.take()
+            if key.lower() == "has":
+                field = self.take("word")[1]; self.take("op", ")")
+                return Has(field)
+            if key.lower() not in _FUNCTIONS:
+                raise QuerySyntaxError(f"Unknown function '{key}'", token[2])
+            inner = self.parse_or(); self.take("op", ")")
+            return _FUNCTIONS[key.lower()](inner)
+        op_token = self.take("op")
+        op = op_token[1]
+        value_token = self.peek()
+        if value_token[0] not in ("word", "string"):
+            raise QuerySyntaxError(f"Expected a value after '{op}'", value_token[2])
+        value = self.take()[1]
+        if op == "~": return Contains(key, value)
+        if op == "=~": return Regex(key, value, value_token[2])
+        if op == "=":
+            if self.peek()[:2] == ("op", ".."):
+                self.take(); high_token = self.take()
+                return NumericRange(key, self.number(value, value_token), self.number(high_token[1], high_token))
+            return Equals(key, value)
+        number = self.number(value, value_token)
+        if op == ">": return NumericRange(key, low=number, low_inclusive=False)
+        if op == ">=": return NumericRange(key, low=number)
+        if op == "<": return NumericRange(key, high=number, high_inclusive=False)
+        if op == "<=": return NumericRange(key, high=number)
+        raise QuerySyntaxError(f"Unexpected operator '{op}'", op_token[2])
+
+    @staticmethod
+    def number(text, token):
+        value = _as_number(text)
+        if value is None: raise QuerySyntaxError(f"Expected a number but found '{text}'", token[2])
+        return value
+
+
+# --- Index ---
+class QueryIndex:
+    """
+    Hero-level inverted index: for every key, the distinct scalar values seen under it (as
+    (kind, value), see _normalize_scalar) and the heroes they occur in. Plans use it to skip
+    heroes that cannot match.
+    """
+    def __init__(self):
+        self.values_by_key: Dict[str, Dict[Any, Set[str]]] = {}
+        self.heroes_by_key: Dict[str, Set[str]] = {}
+        self.hero_ids: Set[str] = set()
+
+    def add_block(self, hero_id: str, block: dict):
+        for key, value in block.items():
+            self.heroes_by_key.setdefault(key, set()).add(hero_id)
+            for scalar in _scalars(value):
+                normalized = _normalize_scalar(scalar)
+                if normalized is not None:
+                    self.values_by_key.setdefault(key, {}).setdefault(normalized, set()).add(hero_id)
+
+def build_query_index(hero_map: Dict[str, dict]) -> QueryIndex:
+    # Every block of the hero is indexed (not only the search roots), because child()
+    # evaluated on the top-level record can reach blocks anywhere below it.
+    index = QueryIndex()
+    for hero_id, hero_data in hero_map.items():
+        index.hero_ids.add(hero_id)
+        for block, _ in _walk_blocks(hero_data, []):
+            index.add_block(hero_id, block)
+    return index
+
+
+# --- Plans & Execution ---
+def _walk_blocks(data, parents):
+    """Yields (block, parents) for every dict under data, parents first (document order)."""
+    if isinstance(data, dict):
+        yield data, parents
+        child_parents = [*parents, data]
+        for value in data.values():
+            if isinstance(value, (dict, list)): yield from _walk_blocks(value, child_parents)
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, (dict, list)): yield from _walk_blocks(item, parents)
+
+class QueryCancelled(Exception):
+    """Raised by run_query when its cancel_event is set mid-scan."""
+
+class QueryPlan:
+    def __init__(self, text: str, root: Node):
+        self.text = text
+        self.root = root
+
+    def matches(self, block: dict, parents: list = ()) -> bool:
+        return self.root.matches(block, list(parents))
+
+    def candidate_heroes(self, index: Optional[QueryIndex]) -> Optional[Set[str]]:
+        return None if index is None else self.root.candidates(index)
+
+def compile_query(text: str) -> QueryPlan:
+    if not text or not text.strip(): raise QuerySyntaxError("Empty query", 0)
+    return QueryPlan(text, _Parser(text).parse())
+
+def keyword_query(key: str, keyword: str) -> QueryPlan:
+    """
+    The classic 'key contains keyword' search as a plan. The node is built directly, so any key
+    works (spaces, parentheses, 'NOT', ...) and an empty keyword matches every string value.
+    The text is only a readable rendering of it.
+    """
+    escaped = keyword.replace("\\", "\\\\").replace('"', '\\"')
+    return QueryPlan(f'{key}~"{escaped}"', Contains(key, keyword))
+
+def find_matching_blocks(hero_data: dict, plans: List[QueryPlan], roots: Iterable[str] = DEFAULT_ROOTS,
+                         include_top_level: bool = True) -> List[List[dict]]:
+    """
+    Evaluates several plans against one hero in a single walk. A plan that matches the
+    hero's top-level record returns the hero itself; otherwise the blocks under the roots.
+    With include_top_level=False only the blocks under the roots are evaluated.
+    """
+    results = [[] for _ in plans]
+    pending = []
+    for i, plan in enumerate(plans):
+        if include_top_level and plan.root.matches(hero_data, []): results[i].append(hero_data)
+        else: pending.append(i)
+    if pending:
+        for root in roots:
+            for block, parents in _walk_blocks(hero_data.get(root), [hero_data]):
+                for i in pending:
+                    if plans[i].root.matches(block, parents): results[i].append(block)
+    return results
+
+def _evaluate_partition(plans: List[QueryPlan], roots: tuple, include_top_level: bool, hero_items: list) -> list:
+    return [(hero_id, find_matching_blocks(hero_data, plans, roots, include_top_level)) for hero_id, hero_data in hero_items]
+
+def scan_heroes(plans: List[QueryPlan], hero_items: Iterable[Tuple[str, dict]], roots: Iterable[str] = DEFAULT_ROOTS,
+                workers: int = 1, partition_size: int = 100, include_top_level: bool = True):
+    """
+    Yields (hero_id, blocks_per_plan) for a stream of (hero_id, hero_data) pairs, in input order.
+    With workers > 1, partitions of the stream are evaluated in a process pool, keeping only a
+    few partitions in flight so the input can be consumed lazily.
+    """
+    roots = tuple(roots)
+    if workers <= 1:
+        for hero_id, hero_data in hero_items: yield hero_id, find_matching_blocks(hero_data, plans, roots, include_top_level)
+        return
+    # Plans are pickled to the workers as they are (not re-parsed from their text).
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque(); partition = []
+        for item in hero_items:
+            partition.append(item)
+            if len(partition) >= partition_size:
+                in_flight.append(executor.submit(_evaluate_partition, plans, roots, include_top_level, partition)); partition = []
+                if len(in_flight) >= workers * 2: yield from in_flight.popleft().result()
+        if partition: in_flight.append(executor.submit(_evaluate_partition, plans, roots, include_top_level, partition))
+        while in_flight: yield from in_flight.popleft().result()
+
+def run_query(plan: QueryPlan, hero_map: Dict[str, dict], index: Optional[QueryIndex] = None,
+              roots: Iterable[str] = DEFAULT_ROOTS, workers: int = 1, cancel_event=None) -> List[dict]:
+    """
+    Runs a plan over all heroes and returns [{"hero_id", "property_block"}, ...] in hero order.
+    With an index, heroes that cannot match are skipped. With workers > 1 and a large enough
+    scan, hero partitions are evaluated in a process pool.
+    """
+    candidates = plan.candidate_heroes(index)
+    hero_ids = [h for h in hero_map if candidates is None or h in candidates]
+    if len(hero_ids) < PARALLEL_MIN_HEROES: workers = 1
+    size = -(-len(hero_ids) // (workers * 4)) if workers > 1 else 100
+    results = []
+    for hero_id, (blocks,) in scan_heroes([plan], ((h, hero_map[h]) for h in hero_ids), roots, workers, size):
+        if cancel_event is not None and cancel_event.is_set(): raise QueryCancelled()
+        results.extend({"hero_id": hero_id, "property_block": block} for block in blocks)
+    return results
@@ -0,0 +1,236 @@
+# sqlite_export.py
+# Writes the resolved heroes, their stats, skill blocks, parsed skill lines, tooltips,
+# diagnostics and the merged language DB to a single, indexed SQLite database.
+#
+# Example query: all heroes whose special uses the Poison status effect
+#   SELECT DISTINCT hero_id FROM skill_blocks
+#   WHERE root = 'special' AND kind = 'statusEffect' AND type_value = 'Poison';
+#
+# The API server can serve directly from this file (HERODB_BACKEND=sqlite). For that it also
+# holds the query engine's inverted index (block_keys/block_values) and an FTS5 trigram index
+# over the language text (lang_fts), plus the reverse dependency index (entity_usage) for
+# /api/usage.
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from query_engine import build_query_index
+
+SCHEMA_VERSION = 4
+
+SCHEMA_SQL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE heroes (
+    hero_id TEXT PRIMARY KEY, name TEXT, element TEXT, family TEXT, rarity INTEGER,
+    class_type TEXT, mana_speed_id TEXT, special_id TEXT, origin TEXT,
+    max_attack INTEGER, data_json TEXT
+);
+CREATE TABLE hero_stats (
+    hero_id TEXT, costume TEXT, tier TEXT,
+    attack REAL, defense REAL, health REAL, power REAL,
+    PRIMARY KEY (hero_id, costume, tier)
+);
+CREATE TABLE skill_blocks (
+    block_pk INTEGER PRIMARY KEY, hero_id TEXT, root TEXT, path TEXT,
+    block_id TEXT, kind TEXT, type_value TEXT, block_json TEXT
+);
+CREATE TABLE skill_lines (
+    line_pk INTEGER PRIMARY KEY, hero_id TEXT, skill_type TEXT, position INTEGER,
+    parent_line_pk INTEGER, item_id TEXT, lang_id TEXT, params_json TEXT,
+    en TEXT, ja TEXT, title_en TEXT, title_ja TEXT
+);
+CREATE TABLE skill_line_params (line_pk INTEGER, name TEXT, value TEXT, num_value REAL);
+CREATE TABLE tooltips (line_pk INTEGER PRIMARY KEY, hero_id TEXT, lang_id TEXT, params_json TEXT, en TEXT, ja TEXT);
+CREATE TABLE warnings (warning_pk INTEGER PRIMARY KEY, parser TEXT, code TEXT, hero_id TEXT, block_id TEXT, message TEXT);
+CREATE TABLE warning_counts (code TEXT PRIMARY KEY, count INTEGER);
+CREATE TABLE lang (key TEXT PRIMARY KEY, en TEXT, ja TEXT);
+CREATE TABLE entity_usage (entity_id TEXT, kind TEXT, hero_id TEXT, path TEXT);
+CREATE TABLE block_keys (key TEXT, hero_id TEXT);
+CREATE TABLE block_values (key TEXT, kind TEXT, value, hero_id TEXT);
+"""
+
+# Indexes are created after the bulk inserts, which is considerably faster than maintaining them row by row.
+INDEX_SQL = """
+CREATE INDEX idx_heroes_element ON heroes (element);
+CREATE INDEX idx_heroes_special ON heroes (special_id);
+CREATE INDEX idx_blocks_hero ON skill_blocks (hero_id);
+CREATE INDEX idx_blocks_id ON skill_blocks (block_id);
+CREATE INDEX idx_blocks_kind_type ON skill_blocks (kind, type_value);
+CREATE INDEX idx_lines_hero ON skill_lines (hero_id, skill_type, position);
+CREATE INDEX idx_lines_lang ON skill_lines (lang_id);
+CREATE INDEX idx_lines_item ON skill_lines (item_id);
+CREATE INDEX idx_line_params ON skill_line_params (line_pk);
+CREATE INDEX idx_line_params_name ON skill_line_params (name, num_value);
+CREATE INDEX idx_tooltips_lang ON tooltips (lang_id);
+CREATE INDEX idx_warnings_parser ON warnings (parser);
+CREATE INDEX idx_warnings_code ON warnings (code);
+CREATE INDEX idx_entity_usage ON entity_usage (entity_id);
+CREATE INDEX idx_block_keys ON block_keys (key);
+CREATE INDEX idx_block_values ON block_values (key, kind, value);
+"""
+
+# The key that names a block's type, checked in order. The key itself becomes `kind`.
+BLOCK_TYPE_KEYS = ["propertyType", "statusEffect", "familiarType", "passiveSkillType", "effectType"]
+BLOCK_ROOTS = {"specialId_details": "special", "passiveSkills": "passive", "costumeBonusPassiveSkillIds": "costume_passive"}
+# Trigram tokenizer (SQLite 3.34+) so MATCH finds arbitrary substrings, including Japanese text.
+LANG_FTS_SQL = "CREATE VIRTUAL TABLE lang_fts USING fts5(key, en, ja, content='lang', tokenize='trigram')"
+# Stored hero JSON uses the same compact encoding as the API responses, so it can be spliced in as-is.
+COMPACT_JSON = {"ensure_ascii": False, "separators": (",", ":")}
+
+
+def _iter_blocks(data, path):
+    """Yields (path, block) for every dict carrying an 'id' under data."""
+    if isinstance(data, dict):
+        if isinstance(data.get("id"), str): yield path, data
+        for key, value in data.items():
+            if isinstance(value, (dict, list)): yield from _iter_blocks(value, f"{path}.{key}")
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            if isinstance(item, (dict, list)): yield from _iter_blocks(item, f"{path}[{i}]")
+
+
+def _block_rows(hero_id: str, hero_data: dict):
+    for root_key, root_name in BLOCK_ROOTS.items():
+        for path, block in _iter_blocks(hero_data.get(root_key), root_key):
+            kind = next((k for k in BLOCK_TYPE_KEYS if isinstance(block.get(k), str)), None)
+            yield (hero_id, root_name, path, block["id"], kind, block.get(kind) if kind else None,
+                   json.dumps(block, ensure_ascii=False))
+
+
+def _index_rows(debug_data: dict):
+    """Flattens the query engine's inverted index into (key, hero_id) and (key, kind, value, hero_id) rows."""
+    index = build_query_index(debug_data)
+    key_rows = [(key, hero_id) for key, hero_ids in index.heroes_by_key.items() for hero_id in hero_ids]
+    value_rows = []
+    for key, values in index.values_by_key.items():
+        for (kind, value), hero_ids in values.items():
+            value_rows.extend((key, kind, value, hero_id) for hero_id in hero_ids)
+    return key_rows, value_rows
+
+
+def _create_lang_fts(conn) -> bool:
+    try:
+        conn.execute(LANG_FTS_SQL)
+    except sqlite3.OperationalError as e:
+        print(f" -> WARNING: FTS5 trigram index unavailable ({e}); language searches will scan the lang table.")
+        return False
+    conn.execute("INSERT INTO lang_fts (lang_fts) VALUES ('rebuild')")
+    return True
+
+
+def _number_or_none(value):
+    if isinstance(value, bool): return None
+    if isinstance(value, (int, float)): return float(value)
+    try: return float(value)
+    except (TypeError, ValueError): return None
+
+
+class _LineWriter:
+    """Flattens skillDescriptions (including nested_effects) into skill_lines and friends."""
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.next_pk = 1
+        self.lines, self.params, self.tooltips = [], [], []
+
+    def add_items(self, hero_id: str, skill_type: str, items: list, parent_pk=None):
+        for position, item in enumerate(items):
+            if not isinstance(item, dict): continue
+            line_pk = self.next_pk; self.next_pk += 1
+            params_json = item.get("params")
+            self.lines.append((
+                line_pk, hero_id, skill_type, position, parent_pk, item.get("id"), item.get("lang_id"), params_json,
+                item.get("en", item.get("description_en")), item.get("ja", item.get("description_ja")),
+                item.get("title_en"), item.get("title_ja")
+            ))
+            try: params = json.loads(params_json) if params_json else {}
+            except (TypeError, ValueError): params = {}
+            for name, value in params.items():
+                self.params.append((line_pk, name, str(value), _number_or_none(value)))
+            if isinstance(extra := item.get("extra"), dict):
+                self.tooltips.append((line_pk, hero_id, extra.get("lang_id"), extra.get("params"), extra.get("en"), extra.get("ja")))
+            if isinstance(nested := item.get("nested_effects"), list):
+                self.add_items(hero_id, skill_type, nested, parent_pk=line_pk)
+
+    def flush(self):
+        self.cursor.executemany("INSERT INTO skill_lines VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", self.lines)
+        self.cursor.executemany("INSERT INTO skill_line_params VALUES (?,?,?,?)", self.params)
+        self.cursor.executemany("INSERT INTO tooltips VALUES (?,?,?,?,?,?)", self.tooltips)
+        self.lines, self.params, self.tooltips = [], [], []
+
+
+def write_sqlite_db(output_path: Path, debug_data: dict, final_hero_data: list, lang_db: dict,
+                    hero_stats_db, diagnostics, usage_entities: dict = None):
+    """
+    Builds the database in a temporary file with bulk inserts inside one transaction,
+    then atomically replaces output_path. usage_entities is the "entities" part of
+    entity_usage.json; without it the entity_usage table stays empty.
+    """
+    print(f"\n--- Writing SQLite database to {output_path.name} ---")
+    temp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    if temp_path.exists(): temp_path.unlink()
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA_SQL)
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+
+        final_by_id = {hero.get("id"): hero for hero in final_hero_data}
+        hero_rows, stat_rows, block_rows = [], [], []
+        lines = _LineWriter(cur)
+        for hero_id, hero_data in debug_data.items():
+            final_hero = final_by_id.get(hero_id, {})
+            hero_stat_rows = list(hero_stats_db.stat_rows(hero_id))
+            hero_rows.append((
+                hero_id, final_hero.get("name") or hero_stats_db.name(hero_id), hero_data.get("element"), hero_data.get("family"),
+                hero_data.get("rarity"), hero_data.get("classType"), hero_data.get("manaSpeedId"), hero_data.get("specialId"),
+                hero_data.get("origin"), hero_stats_db.max_attack(hero_id), json.dumps(hero_data, **COMPACT_JSON)
+            ))
+            stat_rows.extend(hero_stat_rows)
+            block_rows.extend(_block_rows(hero_id, hero_data))
+            for skill_type, skill_data in (final_hero.get("skillDescriptions") or {}).items():
+                lines.add_items(hero_id, skill_type, skill_data if isinstance(skill_data, list) else [skill_data])
+
+        cur.executemany("INSERT INTO heroes VALUES (?,?,?,?,?,?,?,?,?,?,?)", hero_rows)
+        cur.executemany("INSERT INTO hero_stats VALUES (?,?,?,?,?,?,?)", stat_rows)
+        cur.executemany("INSERT INTO skill_blocks (hero_id, root, path, block_id, kind, type_value, block_json) VALUES (?,?,?,?,?,?,?)", block_rows)
+        lines.flush()
+
+        # Only the bounded per-code sample is stored; warning_counts has the full counts.
+        warning_rows = [(e.parser, e.code, hero_id, e.block_id, e.message) for hero_id, e in diagnostics.samples]
+        cur.executemany("INSERT INTO warnings (parser, code, hero_id, block_id, message) VALUES (?,?,?,?,?)", warning_rows)
+        cur.executemany("INSERT INTO warning_counts VALUES (?,?)", diagnostics.by_code.items())
+        cur.executemany("INSERT INTO lang VALUES (?,?,?)", ((k, v.get("en", ""), v.get("ja", "")) for k, v in lang_db.items()))
+        key_rows, value_rows = _index_rows(debug_data)
+        cur.executemany("INSERT INTO block_keys VALUES (?,?)", key_rows)
+        cur.executemany("INSERT INTO block_values VALUES (?,?,?,?)", value_rows)
+        usage_rows = [
+            (entity_id, entity["kind"], hero_id, path)
+            for entity_id, entity in (usage_entities or {}).items()
+            for hero_id, paths in entity["heroes"].items() for path in paths
+        ]
+        cur.executemany("INSERT INTO entity_usage VALUES (?,?,?,?)", usage_rows)
+        has_fts = _create_lang_fts(conn)
+
+        cur.executemany("INSERT INTO meta VALUES (?,?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("generated_at", datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            ("hero_count", str(len(hero_rows))),
+            ("lang_key_count", str(len(lang_db))),
+            ("lang_fts", "1" if has_fts else "0"),
+            ("entity_usage", "1" if usage_entities is not None else "0"),
+        ])
+        conn.executescript(INDEX_SQL) # executescript commits the open transaction first
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.close()
+        os.replace(temp_path, output_path)
+        print(f"Successfully saved {len(hero_rows)} heroes, {len(block_rows)} skill blocks and {lines.next_pk - 1} skill lines.")
+    except Exception as e:
+        conn.close()
+        if temp_path.exists(): temp_path.unlink()
+        print(f"FATAL: Failed to write SQLite database: {e}")
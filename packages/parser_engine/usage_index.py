@@ -0,0 +1,70 @@
+# usage_index.py
+# Reverse dependency index: for every master_db id (special, property, status effect,
+# familiar, familiar effect, passive), the heroes that reference it and where. Phase 1
+# records the references while it resolves each hero, and the index is saved next to
+# debug_hero_data.json as entity_usage.json. The paths are dotted paths into that file.
+#
+# Command line lookup:  python usage_index.py <entity_id>
+
+import json
+import os
+import sys
+from pathlib import Path
+
+USAGE_INDEX_VERSION = 1
+USAGE_INDEX_FILENAME = "entity_usage.json"
+
+# game_db keys in the order master_db is merged, so later categories win as they do there.
+ENTITY_KINDS = [
+    ("character_specials", "special"), ("special_properties", "property"),
+    ("status_effects", "statusEffect"), ("familiars", "familiar"),
+    ("familiar_effects", "familiarEffect"), ("passive_skills", "passiveSkill"),
+]
+
+class UsageIndex:
+    def __init__(self):
+        self.hero_id = None
+        self.entities = {} # entity_id -> {hero_id: [path, ...]}
+
+    def record(self, entity_id: str, path: str):
+        paths = self.entities.setdefault(entity_id, {}).setdefault(self.hero_id, [])
+        if path not in paths: paths.append(path)
+
+    def to_json(self, game_db: dict) -> dict:
+        kinds = {}
+        for db_key, kind in ENTITY_KINDS:
+            for entity_id in game_db.get(db_key, {}): kinds[entity_id] = kind
+        return {
+            "version": USAGE_INDEX_VERSION,
+            "entities": {
+                entity_id: {"kind": kinds.get(entity_id), "heroes": heroes}
+                for entity_id, heroes in sorted(self.entities.items())
+            },
+        }
+
+def write_usage_index(usage: UsageIndex, game_db: dict, output_path: Path):
+    print(f"\n--- Writing entity usage index to {output_path.name} ---")
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(usage.to_json(game_db), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, output_path)
+        print(f"Successfully saved usage of {len(usage.entities)} entities.")
+    except Exception as e:
+        print(f"FATAL: Failed to write entity usage index: {e}")
+
+def load_usage_index(path: Path) -> dict:
+    """Returns {entity_id: {"kind": ..., "heroes": {hero_id: [paths]}}}."""
+    with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+    if data.get("version") != USAGE_INDEX_VERSION:
+        raise ValueError(f"'{path.name}' has an unknown format; re-run hero_main.py.")
+    return data["entities"]
+
+if __name__ == "__main__":
+    from hero_data_loader import OUTPUT_DIR
+    if len(sys.argv) != 2: sys.exit("Usage: python usage_index.py <entity_id>")
+    entity = load_usage_index(OUTPUT_DIR / USAGE_INDEX_FILENAME).get(sys.argv[1])
+    if not entity: sys.exit(f"No hero references '{sys.argv[1]}'.")
+    print(f"{sys.argv[1]} ({entity['kind']}) is used by {len(entity['heroes'])} heroes:")
+    for hero_id, paths in entity["heroes"].items():
+        print(f"  {hero_id:<40} {', '.join(paths)}")
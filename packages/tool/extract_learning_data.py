@@ -2,6 +2,7 @@
 
 import json
 import argparse
+import re
 from pathlib import Path
 import sys
 
@@ -22,87 +23,205 @@ SOURCE_JSON_PATH = PROJECT_ROOT / "data" / "output" / "debug_hero_data.json"
 OUTPUT_DIR = TOOLS_DIR / "output"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# The query engine lives in parser_engine, so add the parent 'packages' directory to the path
+sys.path.append(str(TOOLS_DIR.parent))
+from parser_engine.query_engine import QuerySyntaxError, compile_query, keyword_query, scan_heroes
 
-def find_nested_properties(data, key_to_find, keyword, results):
+READ_CHUNK_SIZE = 1 << 16
+
+
+def iter_hero_items(json_path: Path):
+    """
+    Yields (hero_id, hero_data) pairs from the top-level object of debug_hero_data.json
+    one hero at a time, so the whole file is never decoded into memory at once.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        buffer = ""; pos = 0; eof = False
+
+        def fill():
+            # Drops the consumed prefix and appends the next chunk. Returns False at EOF.
+            nonlocal buffer, pos, eof
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk: eof = True; return False
+            buffer = buffer[pos:] + chunk; pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n": pos += 1
+                if pos < len(buffer) or not fill(): return
+
+        def expect(char):
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buffer) or buffer[pos] != char:
+                found = buffer[pos] if pos < len(buffer) else "EOF"
+                raise ValueError(f"Expected '{char}' but found '{found}' in {json_path.name}")
+            pos += 1
+
+        def decode_value():
+            nonlocal pos
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A value that ends exactly at the buffer edge may still be truncated.
+                    if end < len(buffer) or eof:
+                        pos = end; return value
+                except json.JSONDecodeError:
+                    if eof: raise
+                if not fill():
+                    value, pos = decoder.raw_decode(buffer, pos); return value
+
+        expect("{")
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == "}": return
+        while True:
+            hero_id = decode_value()
+            expect(":")
+            yield hero_id, decode_value()
+            skip_whitespace()
+            if pos < len(buffer) and buffer[pos] == ",": pos += 1; continue
+            expect("}")
+            return
+
+
+def load_query_file(query_file: Path) -> list:
+    """
+    Reads one query per line: either '<key>,<keyword>' or 'query: <expression>'.
+    Blank lines and '#' comments are ignored.
+    """
+    queries = []
+    with open(query_file, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"): continue
+            if line.lower().startswith("query:"):
+                queries.append(("query", line[len("query:"):].strip()))
+                continue
+            key, sep, keyword = line.partition(",")
+            if not sep or not key.strip() or not keyword.strip():
+                raise ValueError(f"{query_file.name}:{line_no}: expected '<key>,<keyword>' or 'query: <expression>', got '{line}'")
+            queries.append(("keyword", (key.strip(), keyword.strip())))
+    return queries
+
+
+def describe_query(query) -> str:
+    kind, spec = query
+    return f"key='{spec[0]}' contains keyword='{spec[1]}'" if kind == "keyword" else f"query '{spec}'"
+
+
+def build_output_paths(queries: list) -> list:
     """
-    Recursively searches through a nested data structure (dicts and lists)
-    to find dictionaries containing a specific key and keyword.
+    Keeps the '<keyword>_data.json' name for keyword queries, adding the key only when two
+    queries share a keyword. Expression queries are named after a slug of the expression.
     """
-    if isinstance(data, dict):
-        # Check if the current dictionary matches the criteria
-        if key_to_find in data and isinstance(data[key_to_find], str) and keyword.lower() in data[key_to_find].lower():
-            results.append(data)
-        
-        # Continue searching in the values of the current dictionary
-        for key, value in data.items():
-            find_nested_properties(value, key_to_find, keyword, results)
-            
-    elif isinstance(data, list):
-        # Continue searching in each item of the list
-        for item in data:
-            find_nested_properties(item, key_to_find, keyword, results)
+    names = []
+    for kind, spec in queries:
+        if kind == "keyword": names.append(spec[1].lower())
+        else: names.append("query_" + (re.sub(r'[^a-z0-9]+', '_', spec.lower()).strip('_')[:60] or "all"))
+    paths = []
+    for (kind, spec), name in zip(queries, names):
+        if kind == "keyword" and names.count(name) > 1: name = f"{spec[0].lower()}_{name}"
+        paths.append(OUTPUT_DIR / f"{name}_data.json")
+    return paths
+
+
+def scan_special_blocks(plans: list, hero_items, workers: int = 1):
+    """
+    Yields (hero_id, blocks_per_plan) with the blocks under each hero's specialId_details that
+    match each plan. The hero's own top-level record is never returned, as the tool has always
+    extracted skill blocks only.
+    """
+    return scan_heroes(plans, hero_items, workers=workers, include_top_level=False)
 
 
 def main():
     """Main function to run the extraction process."""
     parser = argparse.ArgumentParser(
         description="Extract specific property or effect blocks from debug_hero_data.json for analysis.",
-        epilog="Example: python extract_learning_data.py --key propertyType --keyword ChainStrike"
+        epilog="Example: python extract_learning_data.py --key propertyType --keyword ChainStrike --query \"statusEffect=Poison AND turns>=3\""
     )
-    parser.add_argument("--key", required=True, help="The JSON key to search for (e.g., 'propertyType', 'statusEffect').")
-    parser.add_argument("--keyword", required=True, help="The keyword to find within the key's value (case-insensitive).")
-    
+    parser.add_argument("--key", action="append", default=[], help="The JSON key to search for (e.g., 'propertyType', 'statusEffect'). Repeat for several queries.")
+    parser.add_argument("--keyword", action="append", default=[], help="The keyword to find within the key's value (case-insensitive). Pairs with the --key in the same position.")
+    parser.add_argument("--query", action="append", default=[], help="A structural query (see parser_engine/query_engine.py), e.g. 'propertyType~chain AND powerMultiplierPerMil>=1000'. Repeatable.")
+    parser.add_argument("--query-file", type=Path, help="A file of '<key>,<keyword>' or 'query: <expression>' lines to extract in the same pass.")
+    parser.add_argument("--workers", type=int, default=1, help="Evaluate hero partitions in this many worker processes.")
+
     args = parser.parse_args()
 
+    if len(args.key) != len(args.keyword):
+        parser.error("Each --key must be paired with exactly one --keyword.")
+    queries = [("keyword", pair) for pair in zip(args.key, args.keyword)] + [("query", q) for q in args.query]
+    if args.query_file:
+        try: queries.extend(load_query_file(args.query_file))
+        except (OSError, ValueError) as e: parser.error(str(e))
+    queries = list(dict.fromkeys(queries))
+    if not queries:
+        parser.error("Provide at least one --key/--keyword pair, --query or a --query-file.")
+    try:
+        plans = [keyword_query(*spec) if kind == "keyword" else compile_query(spec) for kind, spec in queries]
+    except QuerySyntaxError as e:
+        parser.error(f"Invalid query: {e}")
+
     print(f"--- Starting Extraction ---")
     print(f"Source file: {SOURCE_JSON_PATH}")
-    print(f"Searching for blocks where key='{args.key}' contains keyword='{args.keyword}'...")
+    for query in queries:
+        print(f"Searching for blocks where {describe_query(query)}...")
 
     if not SOURCE_JSON_PATH.exists():
         print(f"\n[FATAL ERROR]: Source file not found!")
         print(f"Please make sure '{SOURCE_JSON_PATH.name}' exists in the correct directory.")
         sys.exit(1)
 
-    with open(SOURCE_JSON_PATH, 'r', encoding='utf-8') as f:
-        all_hero_data = json.load(f)
-
-    extracted_data = []
-    total_heroes = len(all_hero_data)
-
-    for i, (hero_id, hero_data) in enumerate(all_hero_data.items()):
-        print(f"\rScanning heroes: [{i+1}/{total_heroes}] {hero_id.ljust(40)}", end="")
-        
-        found_blocks = []
-        # Start the recursive search from the hero's special skill details
-        if special_details := hero_data.get("specialId_details"):
-            find_nested_properties(special_details, args.key, args.keyword, found_blocks)
-        
-        if found_blocks:
-            for block in found_blocks:
-                extracted_data.append({
-                    "hero_id": hero_id,
-                    "property_block": block
-                })
-    
-    print("\n--- Scan Complete ---")
-
-    if not extracted_data:
-        print("No matching blocks were found.")
-        return
-
-    output_filename = f"{args.keyword.lower()}_data.json"
-    output_path = OUTPUT_DIR / output_filename
-    
+    output_paths = build_output_paths(queries)
+    # Every query's blocks are streamed into its own temporary file while scanning,
+    # so memory use does not grow with the number of matches.
+    temp_paths = [p.with_suffix(".json.part") for p in output_paths]
+    match_counts = [0] * len(queries)
+    output_files = [open(p, 'w', encoding='utf-8') for p in temp_paths]
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(extracted_data, f, indent=2, ensure_ascii=False)
-        print(f"\n✅ Successfully extracted {len(extracted_data)} blocks.")
-        print(f"Result saved to: {output_path}")
+        for f in output_files: f.write("[")
+        i = 0
+        hero_results = scan_special_blocks(plans, iter_hero_items(SOURCE_JSON_PATH), workers=args.workers)
+        for i, (hero_id, found_per_query) in enumerate(hero_results, 1):
+            print(f"\rScanning heroes: [{i}] {hero_id.ljust(40)}", end="")
+            for query_index, found_blocks in enumerate(found_per_query):
+                for block in found_blocks:
+                    entry = json.dumps({"hero_id": hero_id, "property_block": block}, indent=2, ensure_ascii=False)
+                    separator = ",\n" if match_counts[query_index] else "\n"
+                    output_files[query_index].write(separator + "  " + entry.replace("\n", "\n  "))
+                    match_counts[query_index] += 1
+        for query_index, f in enumerate(output_files): f.write("\n]" if match_counts[query_index] else "]")
     except Exception as e:
-        print(f"\n[FATAL ERROR]: Could not write output file. Error: {e}")
+        print(f"\n[FATAL ERROR]: Extraction failed. Error: {e}")
+        for f in output_files: f.close()
+        for p in temp_paths: p.unlink(missing_ok=True)
+        sys.exit(1)
+    finally:
+        for f in output_files: f.close()
+
+    print(f"\n--- Scan Complete ({i} heroes) ---")
+
+    for query, temp_path, output_path, count in zip(queries, temp_paths, output_paths, match_counts):
+        if not count:
+            temp_path.unlink(missing_ok=True)
+            print(f"No matching blocks were found for {describe_query(query)}.")
+            continue
+        try:
+            temp_path.replace(output_path)
+            print(f"✅ Extracted {count} blocks for {describe_query(query)} -> {output_path}")
+        except Exception as e:
+            print(f"\n[FATAL ERROR]: Could not write output file. Error: {e}")
 
 if __name__ == "__main__":
     main()
 
 # D:\HeroDB_Projectにいる状態で
-# python packages/tools/extract_learning_data.py --key propertyType --keyword ChainStrike
\ No newline at end of file
+# python packages/tools/extract_learning_data.py --key propertyType --keyword ChainStrike
+# 複数の抽出を1回の走査で行う場合:
+# python packages/tools/extract_learning_data.py --key propertyType --keyword ChainStrike --key statusEffect --keyword Poison
+# python packages/tools/extract_learning_data.py --query "propertyType~chain AND powerMultiplierPerMil>=1000"
+# python packages/tools/extract_learning_data.py --query-file queries.txt   (1行に '<key>,<keyword>' または 'query: <式>')
@@ -0,0 +1,73 @@
+# packages/tool/test_extract_learning_data.py
+# Pins the tool's --key/--keyword extraction to its original semantics: only the blocks under
+# each hero's specialId_details are searched, never the hero's own top-level record.
+# Run with: python -m pytest packages/tool
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from extract_learning_data import scan_special_blocks
+from parser_engine.query_engine import compile_query, keyword_query
+
+
+def find_nested_properties(data, key_to_find, keyword, results):
+    """The original extraction: every dict under specialId_details whose key contains keyword."""
+    if isinstance(data, dict):
+        if key_to_find in data and isinstance(data[key_to_find], str) and keyword.lower() in data[key_to_find].lower():
+            results.append(data)
+        for value in data.values(): find_nested_properties(value, key_to_find, keyword, results)
+    elif isinstance(data, list):
+        for item in data: find_nested_properties(item, key_to_find, keyword, results)
+
+
+HEROES = {
+    "ice_golem": {
+        "id": "ice_golem", "name": "Ice Golem",
+        "specialId_details": {
+            "id": "frost_special",
+            "properties": [
+                {"id": "ice_wall", "propertyType": "ChainStrike", "nested": {"id": "ice_shard", "propertyType": "Damage"}},
+                {"id": "stone", "propertyType": "Heal"},
+            ],
+            "statusEffects": [{"id": "chill", "statusEffect": "Ice"}],
+        },
+        "passiveSkills": [{"id": "ice_passive"}],
+    },
+    "fire_imp": {
+        "id": "fire_imp",
+        "specialId_details": {"id": "fire_special", "properties": [{"id": "fireball", "propertyType": "chainstrike"}]},
+    },
+    "no_special": {"id": "ice_only_top_level"},
+}
+
+
+def _extract(key, keyword):
+    return [(hero_id, block) for hero_id, (blocks,) in scan_special_blocks([keyword_query(key, keyword)], HEROES.items()) for block in blocks]
+
+
+def _original(key, keyword):
+    results = []
+    for hero_id, hero_data in HEROES.items():
+        found = []
+        if special_details := hero_data.get("specialId_details"): find_nested_properties(special_details, key, keyword, found)
+        results.extend((hero_id, block) for block in found)
+    return results
+
+
+def test_keyword_queries_match_the_original_extraction():
+    for key, keyword in [("id", "ice"), ("id", "fire"), ("id", "a"), ("propertyType", "chain"), ("statusEffect", "ice"), ("name", "golem")]:
+        assert _extract(key, keyword) == _original(key, keyword), (key, keyword)
+
+
+def test_top_level_records_are_never_returned():
+    extracted = _extract("id", "ice")
+    assert all("specialId_details" not in block for _, block in extracted)
+    assert [block["id"] for _, block in extracted] == ["ice_wall", "ice_shard"]
+
+
+def test_worker_processes_give_the_same_blocks():
+    plans = [keyword_query("id", "i"), compile_query("propertyType~chain")]
+    serial = list(scan_special_blocks(plans, HEROES.items()))
+    parallel = list(scan_special_blocks(plans, HEROES.items(), workers=2))
+    assert serial == parallel